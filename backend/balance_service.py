@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import threading
+import time
+from solana.rpc.websocket_api import connect
+from solders.rpc.responses import AccountNotification
+
+
+def websocket_url(http_url):
+    # Solana RPC providers serve the websocket API on the same host
+    if http_url.startswith("https://"):
+        return "wss://" + http_url[len("https://"):]
+    if http_url.startswith("http://"):
+        return "ws://" + http_url[len("http://"):]
+    return http_url
+
+
+class BalanceService:
+    """Keeps the wallet balance in memory for the web process.
+
+    A daemon thread with its own event loop holds an accountSubscribe on the
+    wallet and stores the lamports carried by every notification. When the
+    websocket cannot be opened or drops, the thread polls getBalance every
+    `poll_interval` seconds and retries the subscription after
+    `retry_interval`. `watch` pushes changes to Socket.IO clients as
+    "wallet_balance" events from a Socket.IO background task.
+    """
+
+    def __init__(self, client, pubkey, ws_url, poll_interval=10.0, retry_interval=30.0):
+        self.client = client
+        self.pubkey = pubkey
+        self.ws_url = ws_url
+        self.poll_interval = poll_interval
+        self.retry_interval = retry_interval
+        self.lamports = None
+        self.updated_at = None
+        self.source = None
+        self.version = 0
+        self.notifications = 0
+        self.polls = 0
+        self.poll_errors = 0
+        self.ws_errors = 0
+        self.subscribed = False
+        self._thread = None
+
+    def _set(self, lamports, source):
+        self.updated_at = time.time()
+        self.source = source
+        if lamports != self.lamports:
+            self.lamports = lamports
+            self.version += 1
+
+    def poll(self):
+        self.polls += 1
+        try:
+            self._set(self.client.sync_read("get_balance", self.pubkey).value, "poll")
+        except Exception as e:
+            self.poll_errors += 1
+            logging.warning(f"Wallet balance poll failed: {e}")
+
+    def balance(self):
+        # Only the very first request ever waits on RPC, if it beats the subscription
+        if self.lamports is None:
+            self.poll()
+        return None if self.lamports is None else self.lamports / 1e9
+
+    async def _subscribe(self):
+        async with connect(self.ws_url) as websocket:
+            await websocket.account_subscribe(self.pubkey, commitment="confirmed")
+            await websocket.recv()  # Subscription id
+            self.subscribed = True
+            logging.info(f"Subscribed to wallet balance over {self.ws_url}")
+            self.poll()  # Notifications only arrive on change, so start from the current value
+            try:
+                while True:
+                    for message in await websocket.recv():
+                        if isinstance(message, AccountNotification):
+                            self.notifications += 1
+                            self._set(message.result.value.lamports, "subscription")
+            finally:
+                self.subscribed = False
+
+    async def _run(self):
+        while True:
+            try:
+                await self._subscribe()
+            except Exception as e:
+                self.ws_errors += 1
+                logging.warning(f"Wallet balance subscription failed, polling every {self.poll_interval}s: {e}")
+            deadline = time.monotonic() + self.retry_interval
+            while time.monotonic() < deadline:
+                self.poll()
+                await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=lambda: asyncio.run(self._run()), name="balance-service", daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def watch(self, socketio, interval=0.5):
+        def push():
+            seen = self.version
+            while True:
+                socketio.sleep(interval)
+                if self.version != seen and self.lamports is not None:
+                    seen = self.version
+                    socketio.emit("wallet_balance", {"balance": self.lamports / 1e9, "source": self.source})
+        return socketio.start_background_task(push)
+
+    def stats(self):
+        return {
+            "subscribed": self.subscribed,
+            "age_seconds": round(time.time() - self.updated_at, 1) if self.updated_at else None,
+            "notifications": self.notifications,
+            "polls": self.polls,
+            "poll_errors": self.poll_errors,
+            "ws_errors": self.ws_errors,
+        }
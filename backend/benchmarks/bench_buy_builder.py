@@ -0,0 +1,92 @@
+import os
+import struct
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from solders.keypair import Keypair
+from solders.instruction import Instruction, AccountMeta
+from solders.pubkey import Pubkey
+from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price
+from spl.token.constants import TOKEN_PROGRAM_ID
+from spl.token.instructions import get_associated_token_address, create_associated_token_account
+from buy_builder import BuyTransactionBuilder
+
+# Compares the buy instruction construction that buy_token used to do on every
+# call with BuyTransactionBuilder. Run with: python benchmarks/bench_buy_builder.py [mints] [rounds]
+
+
+def legacy_build(payer, contract_address, min_tokens_out, max_sol_cost):
+    pump_fun_program_id = Pubkey.from_string("6EF8rrecthR5Dkzon8Nwu78hRvfH8m3mH6WxsPvaRNW")
+    global_account = Pubkey.from_string("4wTV1YmiEkRvAtNtw9NZuPEqXhhX5vEiqWpXhF6bbPSM")
+    fee_recipient = Pubkey.from_string("CebN5WGQ4jvKTPtTangStie375uDF1dVtaudpGZaJmvA")
+    event_authority = Pubkey.from_string("Ce6TQqeH7tMRFdodFKmDAU6k42nNiHY8RWG9S5RWK6s")
+    token_mint = Pubkey.from_string(contract_address)
+    bonding_curve = Pubkey.find_program_address(
+        [b"bonding-curve", bytes(token_mint)],
+        pump_fun_program_id
+    )[0]
+    associated_bonding_curve = get_associated_token_address(bonding_curve, token_mint)
+    associated_user = get_associated_token_address(payer, token_mint)
+    system_program = Pubkey.from_string("11111111111111111111111111111111")
+    rent_sysvar = Pubkey.from_string("SysvarRent111111111111111111111111111111111")
+
+    data = bytearray()
+    data.extend(bytes.fromhex("66063d1201daebea"))
+    data.extend(struct.pack('<Q', min_tokens_out))
+    data.extend(struct.pack('<Q', max_sol_cost))
+    accounts = [
+        AccountMeta(pubkey=global_account, is_signer=False, is_writable=False),
+        AccountMeta(pubkey=fee_recipient, is_signer=False, is_writable=True),
+        AccountMeta(pubkey=token_mint, is_signer=False, is_writable=False),
+        AccountMeta(pubkey=bonding_curve, is_signer=False, is_writable=True),
+        AccountMeta(pubkey=associated_bonding_curve, is_signer=False, is_writable=True),
+        AccountMeta(pubkey=associated_user, is_signer=False, is_writable=True),
+        AccountMeta(pubkey=payer, is_signer=True, is_writable=True),
+        AccountMeta(pubkey=system_program, is_signer=False, is_writable=False),
+        AccountMeta(pubkey=TOKEN_PROGRAM_ID, is_signer=False, is_writable=False),
+        AccountMeta(pubkey=rent_sysvar, is_signer=False, is_writable=False),
+        AccountMeta(pubkey=event_authority, is_signer=False, is_writable=False),
+        AccountMeta(pubkey=pump_fun_program_id, is_signer=False, is_writable=False),
+    ]
+    return [
+        set_compute_unit_limit(300_000),
+        set_compute_unit_price(100_000),
+        create_associated_token_account(payer, payer, token_mint),
+        Instruction(program_id=pump_fun_program_id, accounts=accounts, data=bytes(data)),
+    ]
+
+
+def builder_build(builder, contract_address, min_tokens_out, max_sol_cost):
+    mint_accounts = builder.derive(contract_address)
+    return builder.build_instructions(mint_accounts, min_tokens_out, max_sol_cost, create_ata=True)
+
+
+def main():
+    mint_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    payer = Keypair().pubkey()
+    mints = [str(Keypair().pubkey()) for _ in range(mint_count)]
+    builder = BuyTransactionBuilder(payer, cache_size=mint_count, idempotent_ata=False)
+
+    assert legacy_build(payer, mints[0], 1, 10_500_000) == builder_build(builder, mints[0], 1, 10_500_000)
+
+    def run_legacy():
+        for mint in mints:
+            legacy_build(payer, mint, 1, 10_500_000)
+
+    def run_builder():
+        for mint in mints:
+            builder_build(builder, mint, 1, 10_500_000)
+
+    calls = mint_count * rounds
+    legacy = min(timeit.repeat(run_legacy, number=rounds, repeat=3))
+    cached = min(timeit.repeat(run_builder, number=rounds, repeat=3))
+    print(f"per-call construction: {legacy / calls * 1e6:8.1f} us/buy")
+    print(f"BuyTransactionBuilder: {cached / calls * 1e6:8.1f} us/buy ({legacy / cached:.1f}x)")
+    print(f"cache: {builder.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
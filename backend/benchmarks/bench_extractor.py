@@ -0,0 +1,65 @@
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from contract_extractor import ContractExtractor
+
+# Replays a message corpus through ContractExtractor and the old inline regex.
+# Each JSONL line is {"text": ..., "expected": [addresses]}; "expected" is optional.
+# Run with: python benchmarks/bench_extractor.py [corpus.jsonl] [rounds] [--pump-only]
+
+LEGACY_PATTERN = r"\b[1-9A-HJ-NP-Za-km-z]{44}\b"
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "messages.jsonl")
+
+
+def load_corpus(path):
+    with open(path, "r", encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def score(corpus, extract):
+    false_positives = false_negatives = 0
+    for row in corpus:
+        if "expected" not in row:
+            continue
+        found = extract(row["text"])
+        expected = row["expected"]
+        false_positives += len(found) - sum(1 for address in found if address in expected)
+        false_negatives += sum(1 for address in expected if address not in found)
+    return false_positives, false_negatives
+
+
+def throughput(corpus, extract, rounds):
+    texts = [row["text"] for row in corpus]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            extract(text)
+    return len(texts) * rounds / (time.perf_counter() - start)
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    path = args[0] if args else DEFAULT_CORPUS
+    rounds = int(args[1]) if len(args) > 1 else 2000
+    corpus = load_corpus(path)
+    extractor = ContractExtractor(pump_only="--pump-only" in sys.argv)
+
+    candidates = {
+        "legacy regex": lambda text: re.findall(LEGACY_PATTERN, text),
+        "ContractExtractor": extractor.extract,
+    }
+    print(f"corpus: {path} ({len(corpus)} messages x {rounds} rounds)")
+    for name, extract in candidates.items():
+        false_positives, false_negatives = score(corpus, extract)
+        rate = throughput(corpus, extract, rounds)
+        print(f"{name:18} {rate:12,.0f} msg/s  false positives: {false_positives:3}  missed: {false_negatives:3}")
+    print(f"extractor: {extractor.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import asyncio
+import os
+import random
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from solders.keypair import Keypair
+from buy_builder import BuyTransactionBuilder
+from fake_rpc import FakeRpcServer
+from position_monitor import PositionMonitor
+from rpc_pool import RpcPool
+
+# Times PositionMonitor ticks over a synthetic portfolio served by FakeRpcServer.
+# Run with: python benchmarks/bench_positions.py [positions] [ticks] [rpc latency seconds]
+
+INITIAL_VIRTUAL_TOKENS = 1_073_000_000_000_000
+INITIAL_VIRTUAL_SOL = 30_000_000_000
+
+
+def curve_data(virtual_tokens, virtual_sol):
+    real_tokens = max(virtual_tokens - 279_900_000_000_000, 0)
+    return bytes(8) + struct.pack("<QQQQQ?", virtual_tokens, virtual_sol, real_tokens, max(virtual_sol - INITIAL_VIRTUAL_SOL, 0),
+                                  1_000_000_000_000_000, False)
+
+
+def token_account_data(mint, owner, amount):
+    return bytes(mint) + bytes(owner) + struct.pack("<Q", amount) + bytes(93)
+
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    latency = float(sys.argv[3]) if len(sys.argv) > 3 else 0.01
+    random.seed(1)
+
+    server = FakeRpcServer(latency=latency)
+    pool = RpcPool([await server.start()])
+    owner = Keypair().pubkey()
+    builder = BuyTransactionBuilder(owner, cache_size=count)
+    sells = []
+
+    async def record_sell(position, amount, min_sol_output, expected_lamports, reason):
+        sells.append(reason)
+
+    monitor = PositionMonitor(pool, builder, record_sell, sell_cooldown=3600)
+    entry_price = INITIAL_VIRTUAL_SOL / INITIAL_VIRTUAL_TOKENS
+    for _ in range(count):
+        address = str(Keypair().pubkey())
+        monitor.add(address, 10_000_000, 1.0, entry_price=entry_price)
+        accounts = monitor.positions[address].mint_accounts
+        # Price multiples spread across the stop-loss and take-profit bands
+        multiple = random.uniform(0.3, 3.0)
+        virtual_sol = int(INITIAL_VIRTUAL_SOL * multiple ** 0.5)
+        virtual_tokens = int(INITIAL_VIRTUAL_TOKENS / multiple ** 0.5)
+        server.accounts[str(accounts.bonding_curve)] = curve_data(virtual_tokens, virtual_sol)
+        server.accounts[str(accounts.associated_user)] = token_account_data(accounts.mint, owner, 350_000_000_000)
+
+    durations = []
+    for _ in range(ticks):
+        start = time.perf_counter()
+        await monitor.tick()
+        durations.append(time.perf_counter() - start)
+    await asyncio.sleep(0)
+
+    durations.sort()
+    print(f"positions: {count}, ticks: {ticks}, rpc latency {latency * 1000:.0f} ms")
+    print(f"tick: p50 {durations[len(durations) // 2] * 1000:.1f} ms  max {durations[-1] * 1000:.1f} ms")
+    print(f"getMultipleAccounts calls per tick: {server.calls.get('getMultipleAccounts', 0) / ticks:.0f}")
+    print(f"sell orders: {sells.count('take_profit')} take profit, {sells.count('stop_loss')} stop loss")
+    print(f"stats: {monitor.stats()}")
+    await pool.close()
+    await server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,63 @@
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from solders.address_lookup_table_account import AddressLookupTableAccount
+from solders.hash import Hash
+from solders.keypair import Keypair
+from solders.message import MessageV0
+from solders.pubkey import Pubkey
+from solders.transaction import VersionedTransaction
+from buy_builder import BuyTransactionBuilder
+from lookup_table import STATIC_ACCOUNTS
+
+# Serialized size of pump.fun buy transactions compiled with and without the
+# static-account lookup table, and how many mints fit one packet.
+# Run with: python benchmarks/bench_tx_size.py [max mints]
+
+PACKET_DATA_SIZE = 1232
+LOOKUP_TABLE_META_SIZE = 56
+
+
+def lookup_table_data(authority, addresses, slot=1):
+    # Raw account data of an active (never deactivated) lookup table
+    meta = struct.pack("<IQQBB", 1, 2**64 - 1, slot, 0, 1) + bytes(authority) + bytes(2)
+    assert len(meta) == LOOKUP_TABLE_META_SIZE
+    return meta + b"".join(bytes(address) for address in addresses)
+
+
+def buy_transaction(builder, wallet, mints, tables, create_ata=True):
+    instructions = builder.compute_budget_instructions((200_000 * len(mints), 1))
+    for mint in mints:
+        instructions.extend(builder.buy_group(builder.derive(mint), 1_000_000, 10_000_000, create_ata=create_ata))
+    message = MessageV0.try_compile(
+        payer=wallet.pubkey(),
+        instructions=instructions,
+        address_lookup_table_accounts=tables,
+        recent_blockhash=Hash.default()
+    )
+    return VersionedTransaction(message, [wallet])
+
+
+def main():
+    max_mints = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    wallet = Keypair()
+    builder = BuyTransactionBuilder(wallet.pubkey())
+    table = AddressLookupTableAccount(Pubkey.new_unique(), STATIC_ACCOUNTS)
+    mints = [str(Keypair().pubkey()) for _ in range(max_mints)]
+
+    for create_ata in (False, True):
+        print(f"{'buy + create ATA' if create_ata else 'buy'}:")
+        print(f"  {'mints':>5} {'no table':>9} {'table':>9} {'saved':>6}")
+        for count in range(1, max_mints + 1):
+            plain = len(bytes(buy_transaction(builder, wallet, mints[:count], [], create_ata)))
+            compact = len(bytes(buy_transaction(builder, wallet, mints[:count], [table], create_ata)))
+            marker = lambda size: f"{size}{'*' if size > PACKET_DATA_SIZE else ' '}"
+            print(f"  {count:>5} {marker(plain):>9} {marker(compact):>9} {plain - compact:>6}")
+    print(f"* exceeds the {PACKET_DATA_SIZE}-byte packet limit")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import time
+from aiohttp import web
+from solders.hash import Hash
+from solders.transaction import VersionedTransaction
+
+# Minimal Solana JSON-RPC stand-in for local tests and benchmarks.
+#
+#   server = FakeRpcServer(latency=0.02, failure_rate=0.1)
+#   url = await server.start()
+#   pool = RpcPool([url, ...])
+#
+# `latency` (seconds) and `failure_rate` can be changed while the server runs,
+# `method_latency` overrides the latency per method name, and `handlers` can be
+# extended with extra method names. Sent transactions report as confirmed
+# `confirm_delay` seconds after sendTransaction. getMultipleAccounts serves raw
+# account data from `accounts` (base58 pubkey -> bytes), as does getAccountInfo.
+# simulateTransaction reports `units_per_instruction` CU for each instruction.
+# The same URL also accepts websocket accountSubscribe; `set_balance` notifies
+# every subscriber.
+
+
+class FakeRpcServer:
+    def __init__(self, latency=0.0, failure_rate=0.0, host="127.0.0.1", port=0, method_latency=None, confirm_delay=0.4):
+        self.latency = latency
+        self.method_latency = method_latency or {}
+        self.failure_rate = failure_rate
+        self.confirm_delay = confirm_delay
+        self.host = host
+        self.port = port
+        self.slot = 1
+        self.block_height = 1
+        self.balance = 5_000_000_000
+        self.calls = {}
+        self.sent = []
+        self.sent_at = {}  # signature -> (monotonic send time, slot)
+        self.accounts = {}
+        self.units_per_instruction = 20_000
+        self.handlers = {
+            "getLatestBlockhash": self.get_latest_blockhash,
+            "getBalance": self.get_balance,
+            "getTokenAccountsByOwner": self.get_token_accounts_by_owner,
+            "sendTransaction": self.send_transaction,
+            "getSignatureStatuses": self.get_signature_statuses,
+            "getMultipleAccounts": self.get_multiple_accounts,
+            "getAccountInfo": self.get_account_info,
+            "simulateTransaction": self.simulate_transaction,
+        }
+        self._runner = None
+        self._subscribers = []  # (websocket, subscription id)
+
+    def context(self):
+        return {"slot": self.slot, "apiVersion": "1.18.0"}
+
+    def get_latest_blockhash(self, params):
+        self.slot += 1
+        self.block_height += 1
+        blockhash = Hash(hashlib.sha256(str(self.slot).encode()).digest())
+        return {"context": self.context(), "value": {"blockhash": str(blockhash), "lastValidBlockHeight": self.block_height + 150}}
+
+    def get_balance(self, params):
+        return {"context": self.context(), "value": self.balance}
+
+    def get_token_accounts_by_owner(self, params):
+        return {"context": self.context(), "value": []}
+
+    def send_transaction(self, params):
+        tx = VersionedTransaction.from_bytes(base64.b64decode(params[0]))
+        self.sent.append(tx)
+        signature = str(tx.signatures[0])
+        self.sent_at[signature] = (time.monotonic(), self.slot)
+        return signature
+
+    def get_signature_statuses(self, params):
+        now = time.monotonic()
+        statuses = []
+        for signature in params[0]:
+            sent = self.sent_at.get(signature)
+            if sent is None or now - sent[0] < self.confirm_delay:
+                statuses.append(None)
+                continue
+            statuses.append({
+                "slot": sent[1] + 1,
+                "confirmations": None,
+                "err": None,
+                "status": {"Ok": None},
+                "confirmationStatus": "confirmed",
+            })
+        return {"context": self.context(), "value": statuses}
+
+    def account(self, key):
+        data = self.accounts.get(key)
+        if data is None:
+            return None
+        return {
+            "data": [base64.b64encode(data).decode(), "base64"],
+            "executable": False,
+            "lamports": 2_039_280,
+            "owner": "11111111111111111111111111111111",
+            "rentEpoch": 0,
+            "space": len(data),
+        }
+
+    def get_multiple_accounts(self, params):
+        return {"context": self.context(), "value": [self.account(key) for key in params[0]]}
+
+    def get_account_info(self, params):
+        return {"context": self.context(), "value": self.account(params[0])}
+
+    def simulate_transaction(self, params):
+        tx = VersionedTransaction.from_bytes(base64.b64decode(params[0]))
+        units = self.units_per_instruction * len(tx.message.instructions)
+        result = {"err": None, "logs": [], "accounts": None, "unitsConsumed": units, "returnData": None}
+        return {"context": self.context(), "value": result}
+
+    def set_balance(self, lamports):
+        self.balance = lamports
+        for websocket, subscription in list(self._subscribers):
+            notification = {"jsonrpc": "2.0", "method": "accountNotification", "params": {"subscription": subscription, "result": {
+                "context": self.context(),
+                "value": {"data": ["", "base64"], "executable": False, "lamports": lamports,
+                          "owner": "11111111111111111111111111111111", "rentEpoch": 0, "space": 0},
+            }}}
+            asyncio.ensure_future(websocket.send_json(notification))
+
+    async def handle_websocket(self, request):
+        websocket = web.WebSocketResponse()
+        await websocket.prepare(request)
+        async for message in websocket:
+            body = json.loads(message.data)
+            self.calls[body.get("method")] = self.calls.get(body.get("method"), 0) + 1
+            if body.get("method") == "accountSubscribe":
+                subscription = len(self._subscribers) + 1
+                self._subscribers.append((websocket, subscription))
+                await websocket.send_json({"jsonrpc": "2.0", "result": subscription, "id": body.get("id")})
+        self._subscribers = [s for s in self._subscribers if s[0] is not websocket]
+        return websocket
+
+    async def handle(self, request):
+        body = await request.json()
+        method = body.get("method")
+        self.calls[method] = self.calls.get(method, 0) + 1
+        latency = self.method_latency.get(method, self.latency)
+        if latency:
+            await asyncio.sleep(latency)
+        if random.random() < self.failure_rate:
+            return web.Response(status=503, text="injected failure")
+        handler = self.handlers.get(method)
+        if handler is None:
+            error = {"code": -32601, "message": f"Method not found: {method}"}
+            return web.json_response({"jsonrpc": "2.0", "error": error, "id": body.get("id")})
+        return web.json_response({"jsonrpc": "2.0", "result": handler(body.get("params") or []), "id": body.get("id")})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/", self.handle)
+        app.router.add_get("/", self.handle_websocket)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self.url
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+if __name__ == "__main__":
+    import sys
+
+    async def serve():
+        server = FakeRpcServer(
+            latency=float(sys.argv[1]) if len(sys.argv) > 1 else 0.0,
+            failure_rate=float(sys.argv[2]) if len(sys.argv) > 2 else 0.0,
+            port=int(sys.argv[3]) if len(sys.argv) > 3 else 8899,
+        )
+        print(f"Fake RPC listening on {await server.start()}")
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
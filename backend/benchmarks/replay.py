@@ -0,0 +1,210 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from solders.keypair import Keypair
+from fake_rpc import FakeRpcServer
+from bench_positions import INITIAL_VIRTUAL_SOL, INITIAL_VIRTUAL_TOKENS, curve_data
+from bench_tx_size import lookup_table_data
+
+# Offline load test: replays a JSONL message corpus through process_contract and
+# buy_token against FakeRpcServer and a throwaway SQLite database.
+#
+#   python benchmarks/replay.py --rate 50 --pattern burst --burst 5 --rounds 20 --rpc-latency 0.02
+#   python benchmarks/replay.py --pattern burst --burst 20 --batch-size 6 --lookup-table
+#
+# Corpus lines are {"text": ..., "group": ...}; "group" is optional. Every round
+# swaps each address in the corpus for a fresh mint, so repeated rounds still
+# take the buy path instead of being deduplicated.
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def arrival_offsets(count, rate, pattern, burst):
+    # Seconds from the start of the run at which each message is delivered
+    offsets = []
+    now = 0.0
+    for i in range(count):
+        if pattern == "poisson":
+            now += random.expovariate(rate)
+        elif pattern == "burst":
+            if i % burst == 0 and i:
+                now += burst / rate
+        else:
+            now += 1.0 / rate
+        offsets.append(now)
+    return offsets
+
+
+def percentile(samples, q):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay a message corpus against a fake Solana RPC")
+    parser.add_argument("corpus", nargs="?", default=os.path.join(BACKEND_DIR, "benchmarks", "messages.jsonl"))
+    parser.add_argument("--rounds", type=int, default=10, help="times the corpus is replayed")
+    parser.add_argument("--rate", type=float, default=20.0, help="average messages per second")
+    parser.add_argument("--pattern", choices=("uniform", "poisson", "burst"), default="uniform")
+    parser.add_argument("--burst", type=int, default=5, help="messages delivered together in burst mode")
+    parser.add_argument("--rpc-latency", type=float, default=0.02, help="seconds per fake RPC call")
+    parser.add_argument("--send-latency", type=float, default=None, help="seconds per sendTransaction, defaults to --rpc-latency")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of fake RPC calls that fail")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=1, help="queued mints packed into one buy transaction")
+    parser.add_argument("--lookup-table", action="store_true", help="serve a static-account lookup table and compile against it")
+    parser.add_argument("--verbose", action="store_true", help="keep the bot's own prints and INFO logs")
+    return parser.parse_args()
+
+
+def configure_environment(rpc_url, db_path, args, server):
+    # Must run before main is imported: settings and the RPC pool read these at import time
+    os.environ["DATABASE_URI"] = f"sqlite:///{db_path}"
+    os.environ["RPC_ENDPOINTS"] = rpc_url
+    os.environ.setdefault("WALLET_PRIVATE_KEY", str(Keypair()))
+    os.environ["BUY_BATCH_SIZE"] = str(args.batch_size)
+    if args.lookup_table:
+        from lookup_table import STATIC_ACCOUNTS
+        table = Keypair().pubkey()
+        server.accounts[str(table)] = lookup_table_data(Keypair().pubkey(), STATIC_ACCOUNTS)
+        os.environ["LOOKUP_TABLE_ADDRESSES"] = str(table)
+
+
+async def replay(args, server):
+    app_output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    with app_output:
+        import main
+        import telegram_monitor
+        import buy_program
+    from buy_pipeline import StageTimer
+    from contract_extractor import ContractExtractor
+    from metrics import metrics
+
+    with open(args.corpus, "r", encoding="utf-8") as file:
+        corpus = [json.loads(line) for line in file if line.strip()]
+    extractor = ContractExtractor()
+
+    messages = []
+    for _ in range(args.rounds):
+        for row in corpus:
+            text = row["text"]
+            for address in extractor.extract(text):
+                mint = str(Keypair().pubkey())
+                text = text.replace(address, mint)
+                # Serve a fresh curve so detection-time prefetches produce real quotes
+                bonding_curve = buy_program.buy_builder.derive(mint).bonding_curve
+                server.accounts[str(bonding_curve)] = curve_data(INITIAL_VIRTUAL_TOKENS, INITIAL_VIRTUAL_SOL)
+            messages.append((text, row.get("group", "replay")))
+
+    with main.app.app_context():
+        main.db.create_all()
+        main.ensure_schema()
+    pipeline = telegram_monitor.buy_pipeline
+    pipeline.timers = {stage: StageTimer(window=len(messages) * 4) for stage in pipeline.STAGES}
+    main.persistence.start()
+    main.blockhash_service.start()
+    main.confirmation_tracker.poll_interval = 0.1
+    main.confirmation_tracker.start()
+    await buy_program.lookup_tables.load()
+    pipeline.start()
+    await main.blockhash_service.refresh()
+
+    offsets = arrival_offsets(len(messages), args.rate, args.pattern, args.burst)
+    handlers = []
+    with app_output:
+        start = time.perf_counter()
+        for message_id, ((text, group), offset) in enumerate(zip(messages, offsets), 1):
+            delay = start + offset - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            message = SimpleNamespace(
+                id=message_id, raw_text=text, text=text, message=text,
+                date=datetime.now(timezone.utc), media=None, entities=None, fwd_from=None
+            )
+            handlers.append(asyncio.create_task(
+                telegram_monitor.process_contract(None, message, group, is_new=True, received_at=time.perf_counter())
+            ))
+        await asyncio.gather(*handlers)
+        await pipeline.join()
+        elapsed = time.perf_counter() - start
+        deadline = time.monotonic() + server.confirm_delay + 5
+        while main.confirmation_tracker.pending and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        await main.confirmation_tracker.stop()
+
+        db_start = time.perf_counter()
+        main.persistence.stop()
+        flush_seconds = time.perf_counter() - db_start
+        await main.blockhash_service.stop()
+        await pipeline.stop()
+
+    detect_to_send = list(pipeline.timers["detect_to_send"].samples)
+    stats = pipeline.stats()
+    print(f"messages: {len(messages)} in {elapsed:.2f}s ({len(messages) / elapsed:.1f} msg/s, pattern={args.pattern})")
+    print(f"buys: {stats['succeeded']} sent, {stats['failed']} failed ({stats['succeeded'] / elapsed:.1f} buys/s)")
+    print(f"detect->send: p50 {percentile(detect_to_send, 0.50) * 1000:.2f} ms  "
+          f"p99 {percentile(detect_to_send, 0.99) * 1000:.2f} ms  max {max(detect_to_send, default=0) * 1000:.2f} ms")
+
+    print("stage breakdown (mean ms from previous stage):")
+    for (name, labels), histogram in metrics.histograms.items():
+        if name == "xcute_stage_seconds" and histogram.count:
+            print(f"  {dict(labels)['stage']:20} {histogram.sum / histogram.count * 1000:8.3f}  (n={histogram.count})")
+
+    writer = main.persistence.stats()
+    print(f"db writer: {writer['written']} rows in {writer['batches']} batches, avg {writer['avg_batch_ms']} ms/batch, "
+          f"max depth {writer['max_depth']}, final flush {flush_seconds * 1000:.1f} ms")
+    print(f"confirmations: {main.confirmation_tracker.stats()}")
+    print(f"quotes: {buy_program.quote_cache.stats()}")
+    sizes = [len(bytes(tx)) for tx in server.sent]
+    print(f"buy transactions: {len(sizes)}, avg {sum(sizes) / max(len(sizes), 1):.0f} bytes, max {max(sizes, default=0)} bytes, "
+          f"{stats['batches']} batches covering {stats['batched']} mints, lookup tables {buy_program.lookup_tables.stats()}")
+    with main.app.app_context():
+        statuses = main.db.session.execute(
+            main.db.select(main.Transaction.status, main.db.func.count()).group_by(main.Transaction.status)
+        ).all()
+    print(f"transaction rows: {dict(statuses)}")
+    print(f"rpc: {json.dumps(main.solana_client.stats())}")
+    print(f"fake rpc calls: {server.calls}")
+    await main.solana_client.close()
+
+
+async def run(args):
+    random.seed(args.seed)
+    if not args.verbose:
+        logging.disable(logging.INFO)
+    method_latency = {"sendTransaction": args.send_latency} if args.send_latency is not None else {}
+    server = FakeRpcServer(latency=args.rpc_latency, failure_rate=args.failure_rate,
+                           port=free_port(), method_latency=method_latency)
+    rpc_url = await server.start()
+    with tempfile.TemporaryDirectory() as workdir:
+        configure_environment(rpc_url, os.path.join(workdir, "replay.db"), args, server)
+        os.chdir(workdir)  # Keeps logs/ and other relative paths out of the source tree
+        try:
+            await replay(args, server)
+        finally:
+            await server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))
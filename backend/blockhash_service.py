@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import time
+
+
+class BlockhashService:
+    """Keeps a recent blockhash warm so buys never wait on get_latest_blockhash.
+
+    The refresh loop runs in the monitor's event loop. `get_blockhash` answers
+    from the cache while it is younger than `max_age` seconds and only falls
+    back to an inline fetch when the cached hash is missing or too old.
+    """
+
+    def __init__(self, client, refresh_interval=2.0, max_age=20.0):
+        self.client = client
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.blockhash = None
+        self.last_valid_block_height = None
+        self.fetched_at = None
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.refresh_errors = 0
+        self.max_served_age = 0.0
+        self._task = None
+        self._lock = None
+
+    async def refresh(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            response = await self.client.get_latest_blockhash()
+            self.blockhash = response.value.blockhash
+            self.last_valid_block_height = response.value.last_valid_block_height
+            self.fetched_at = time.monotonic()
+            return self.blockhash
+
+    async def run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                self.refresh_errors += 1
+                logging.warning(f"Blockhash refresh failed: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def age(self):
+        if self.fetched_at is None:
+            return None
+        return time.monotonic() - self.fetched_at
+
+    async def get_blockhash(self):
+        age = self.age()
+        if age is not None and age <= self.max_age:
+            self.hits += 1
+            self.max_served_age = max(self.max_served_age, age)
+            return self.blockhash
+
+        self.misses += 1
+        if age is not None:
+            self.stale += 1
+            logging.warning(f"Cached blockhash is {age:.1f}s old, fetching inline")
+        return await self.refresh()
+
+    def stats(self):
+        age = self.age()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "refresh_errors": self.refresh_errors,
+            "age": round(age, 3) if age is not None else None,
+            "max_served_age": round(self.max_served_age, 3),
+            "last_valid_block_height": self.last_valid_block_height,
+        }
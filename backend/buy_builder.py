@@ -0,0 +1,157 @@
+import struct
+from collections import OrderedDict, namedtuple
+from solders.instruction import Instruction, AccountMeta
+from solders.pubkey import Pubkey
+from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price
+from spl.token.constants import ASSOCIATED_TOKEN_PROGRAM_ID, TOKEN_PROGRAM_ID
+from spl.token.instructions import (
+    get_associated_token_address,
+    create_associated_token_account,
+    create_idempotent_associated_token_account,
+)
+
+# Pump.fun constants
+PUMP_FUN_PROGRAM_ID = Pubkey.from_string("6EF8rrecthR5Dkzon8Nwu78hRvfH8m3mH6WxsPvaRNW")
+GLOBAL_ACCOUNT = Pubkey.from_string("4wTV1YmiEkRvAtNtw9NZuPEqXhhX5vEiqWpXhF6bbPSM")
+FEE_RECIPIENT = Pubkey.from_string("CebN5WGQ4jvKTPtTangStie375uDF1dVtaudpGZaJmvA")
+EVENT_AUTHORITY = Pubkey.from_string("Ce6TQqeH7tMRFdodFKmDAU6k42nNiHY8RWG9S5RWK6s")
+
+# System accounts
+SYSTEM_PROGRAM = Pubkey.from_string("11111111111111111111111111111111")
+RENT_SYSVAR = Pubkey.from_string("SysvarRent111111111111111111111111111111111")
+
+BUY_DISCRIMINATOR = bytes.fromhex("66063d1201daebea")
+BUY_ARGS = struct.Struct("<QQ")  # min tokens out, max SOL cost
+SELL_DISCRIMINATOR = bytes.fromhex("33e685a4017f83ad")
+SELL_ARGS = struct.Struct("<QQ")  # token amount, min SOL output
+
+DEFAULT_COMPUTE_UNIT_LIMIT = 300_000
+DEFAULT_COMPUTE_UNIT_PRICE = 100_000  # 0.1 lamports per CU
+
+MintAccounts = namedtuple(
+    "MintAccounts",
+    ["mint", "bonding_curve", "associated_bonding_curve", "associated_user", "buy_accounts", "sell_accounts", "create_ata_instruction"]
+)
+
+
+class BuyTransactionBuilder:
+    """Builds pump.fun buy instructions from precomputed static accounts.
+
+    Per-mint derivations (bonding curve PDA, both ATAs, the 12-account buy
+    list, the sell list and the ATA creation instruction) are memoized in a bounded LRU so repeated buys of the same
+    mint skip the PDA search.
+    """
+
+    def __init__(self, payer, cache_size=1024, idempotent_ata=True):
+        self.payer = payer
+        self.cache_size = cache_size
+        self.idempotent_ata = idempotent_ata
+        self._mint_cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        self._head_accounts = [
+            AccountMeta(pubkey=GLOBAL_ACCOUNT, is_signer=False, is_writable=False),  # 0: Global
+            AccountMeta(pubkey=FEE_RECIPIENT, is_signer=False, is_writable=True),  # 1: Fee recipient
+        ]
+        self._tail_accounts = [
+            AccountMeta(pubkey=payer, is_signer=True, is_writable=True),  # 6: User
+            AccountMeta(pubkey=SYSTEM_PROGRAM, is_signer=False, is_writable=False),  # 7: System program
+            AccountMeta(pubkey=TOKEN_PROGRAM_ID, is_signer=False, is_writable=False),  # 8: Token program
+            AccountMeta(pubkey=RENT_SYSVAR, is_signer=False, is_writable=False),  # 9: Rent sysvar
+            AccountMeta(pubkey=EVENT_AUTHORITY, is_signer=False, is_writable=False),  # 10: Event authority
+            AccountMeta(pubkey=PUMP_FUN_PROGRAM_ID, is_signer=False, is_writable=False),  # 11: Program ID
+        ]
+        self._sell_tail_accounts = [
+            AccountMeta(pubkey=payer, is_signer=True, is_writable=True),  # 6: User
+            AccountMeta(pubkey=SYSTEM_PROGRAM, is_signer=False, is_writable=False),  # 7: System program
+            AccountMeta(pubkey=ASSOCIATED_TOKEN_PROGRAM_ID, is_signer=False, is_writable=False),  # 8: Associated token program
+            AccountMeta(pubkey=TOKEN_PROGRAM_ID, is_signer=False, is_writable=False),  # 9: Token program
+            AccountMeta(pubkey=EVENT_AUTHORITY, is_signer=False, is_writable=False),  # 10: Event authority
+            AccountMeta(pubkey=PUMP_FUN_PROGRAM_ID, is_signer=False, is_writable=False),  # 11: Program ID
+        ]
+        self._compute_budgets = {}  # (unit limit, unit price) -> instructions; a handful of learned sizes
+
+    def compute_budget_instructions(self, compute_budget=None):
+        compute_budget = compute_budget or (DEFAULT_COMPUTE_UNIT_LIMIT, DEFAULT_COMPUTE_UNIT_PRICE)
+        instructions = self._compute_budgets.get(compute_budget)
+        if instructions is None:
+            if len(self._compute_budgets) >= 64:
+                self._compute_budgets.clear()
+            instructions = self._compute_budgets[compute_budget] = (
+                set_compute_unit_limit(compute_budget[0]),
+                set_compute_unit_price(compute_budget[1]),
+            )
+        return list(instructions)
+
+    def derive(self, contract_address):
+        cached = self._mint_cache.get(contract_address)
+        if cached is not None:
+            self._mint_cache.move_to_end(contract_address)
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        token_mint = Pubkey.from_string(contract_address)
+        bonding_curve = Pubkey.find_program_address(
+            [b"bonding-curve", bytes(token_mint)],
+            PUMP_FUN_PROGRAM_ID
+        )[0]
+        associated_bonding_curve = get_associated_token_address(bonding_curve, token_mint)
+        associated_user = get_associated_token_address(self.payer, token_mint)
+        mint_specific = [
+            AccountMeta(pubkey=token_mint, is_signer=False, is_writable=False),  # 2: Mint
+            AccountMeta(pubkey=bonding_curve, is_signer=False, is_writable=True),  # 3: Bonding curve
+            AccountMeta(pubkey=associated_bonding_curve, is_signer=False, is_writable=True),  # 4: Bonding curve ATA
+            AccountMeta(pubkey=associated_user, is_signer=False, is_writable=True),  # 5: User ATA
+        ]
+        buy_accounts = self._head_accounts + mint_specific + self._tail_accounts
+        sell_accounts = self._head_accounts + mint_specific + self._sell_tail_accounts
+        if self.idempotent_ata:
+            create_ata_instruction = create_idempotent_associated_token_account(self.payer, self.payer, token_mint)
+        else:
+            create_ata_instruction = create_associated_token_account(self.payer, self.payer, token_mint)
+        derived = MintAccounts(
+            mint=token_mint,
+            bonding_curve=bonding_curve,
+            associated_bonding_curve=associated_bonding_curve,
+            associated_user=associated_user,
+            buy_accounts=buy_accounts,
+            sell_accounts=sell_accounts,
+            create_ata_instruction=create_ata_instruction,
+        )
+        self._mint_cache[contract_address] = derived
+        if len(self._mint_cache) > self.cache_size:
+            self._mint_cache.popitem(last=False)
+        return derived
+
+    def buy_instruction(self, mint_accounts, min_tokens_out, max_sol_cost):
+        return Instruction(
+            program_id=PUMP_FUN_PROGRAM_ID,
+            accounts=mint_accounts.buy_accounts,
+            data=BUY_DISCRIMINATOR + BUY_ARGS.pack(min_tokens_out, max_sol_cost)
+        )
+
+    def buy_group(self, mint_accounts, min_tokens_out, max_sol_cost, create_ata):
+        # One mint's share of a buy transaction; several groups can share one compute budget
+        instructions = [mint_accounts.create_ata_instruction] if create_ata else []
+        instructions.append(self.buy_instruction(mint_accounts, min_tokens_out, max_sol_cost))
+        return instructions
+
+    def build_instructions(self, mint_accounts, min_tokens_out, max_sol_cost, create_ata, compute_budget=None):
+        return self.compute_budget_instructions(compute_budget) + self.buy_group(
+            mint_accounts, min_tokens_out, max_sol_cost, create_ata
+        )
+
+    def sell_instruction(self, mint_accounts, amount, min_sol_output):
+        return Instruction(
+            program_id=PUMP_FUN_PROGRAM_ID,
+            accounts=mint_accounts.sell_accounts,
+            data=SELL_DISCRIMINATOR + SELL_ARGS.pack(amount, min_sol_output)
+        )
+
+    def build_sell_instructions(self, mint_accounts, amount, min_sol_output, compute_budget=None):
+        return list(self.compute_budget_instructions(compute_budget)) + [self.sell_instruction(mint_accounts, amount, min_sol_output)]
+
+    def cache_info(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._mint_cache), "max_size": self.cache_size}
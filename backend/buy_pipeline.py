@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+
+class StageTimer:
+    def __init__(self, window=1024):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def stats(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.50) * 1000, 2),
+            "p99_ms": round(self.percentile(0.99) * 1000, 2),
+            "max_ms": round(self.max * 1000, 2),
+        }
+
+
+class BuyPipeline:
+    """Detection-to-execution queue consumed by a bounded pool of buy workers.
+
+    Handlers `submit` candidate mints and return immediately. Mints already
+    queued or being bought are dropped, and an optional global rate limit
+    (buys per second) spaces out sends across all workers.
+
+    With a `batch_fn` and `batch_size` above 1, a worker that picks up a mint
+    also takes up to `batch_size - 1` more that are already waiting and hands
+    them to `batch_fn` together. Nothing waits for a batch to fill, so a lone
+    detection is bought exactly as before.
+    """
+
+    STAGES = ("detect", "queue_wait", "rate_wait", "buy", "detect_to_send")
+
+    def __init__(self, buy_fn, concurrency=4, rate_limit=0.0, max_queue=1000, batch_fn=None, batch_size=1):
+        self.buy_fn = buy_fn
+        self.batch_fn = batch_fn
+        self.batch_size = batch_size if batch_fn is not None else 1
+        self.concurrency = concurrency
+        self.rate_interval = 1.0 / rate_limit if rate_limit > 0 else 0.0
+        self.max_queue = max_queue
+        self.in_flight = set()
+        self.timers = {stage: StageTimer() for stage in self.STAGES}
+        self.submitted = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.batches = 0
+        self.batched = 0
+        self._queue = None
+        self._workers = []
+        self._next_slot = 0.0
+
+    def start(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+        while len(self._workers) < self.concurrency:
+            self._workers.append(asyncio.create_task(self._worker(len(self._workers))))
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, contract_address, group_name, detected_at=None, trace=None):
+        if contract_address in self.in_flight:
+            self.duplicates += 1
+            return False
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+        queued_at = time.perf_counter()
+        detected_at = detected_at or queued_at
+        try:
+            self._queue.put_nowait((contract_address, group_name, detected_at, queued_at, trace))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logging.error(f"Buy queue full, dropping {contract_address}")
+            return False
+        self.in_flight.add(contract_address)
+        self.submitted += 1
+        self.timers["detect"].record(queued_at - detected_at)
+        if trace is not None:
+            trace.mark("queued")
+        return True
+
+    async def _rate_wait(self):
+        if not self.rate_interval:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.rate_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _buy(self, batch):
+        # One result per item; failures are returned as exceptions
+        if len(batch) == 1:
+            contract_address, group_name, _, _, trace = batch[0]
+            try:
+                return [await self.buy_fn(contract_address, group_name, trace=trace)]
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                return [e]
+        self.batches += 1
+        self.batched += len(batch)
+        return await self.batch_fn([(contract_address, group_name, trace) for contract_address, group_name, _, _, trace in batch])
+
+    async def _worker(self, worker_id):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                started = time.perf_counter()
+                for _, _, _, queued_at, trace in batch:
+                    if trace is not None:
+                        trace.mark("dequeued")
+                    self.timers["queue_wait"].record(started - queued_at)
+                await self._rate_wait()
+                sending = time.perf_counter()
+                self.timers["rate_wait"].record(sending - started)
+                results = await self._buy(batch)
+                done = time.perf_counter()
+                for (contract_address, _, detected_at, _, _), result in zip(batch, results):
+                    if isinstance(result, Exception):
+                        self.failed += 1
+                        logging.error(f"Buy worker {worker_id} failed for {contract_address}: {result}")
+                        continue
+                    self.timers["buy"].record(done - sending)
+                    self.timers["detect_to_send"].record(done - detected_at)
+                    self.succeeded += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += len(batch)
+                logging.error(f"Buy worker {worker_id} failed for {[item[0] for item in batch]}: {e}")
+            finally:
+                for item in batch:
+                    self.in_flight.discard(item[0])
+                    self._queue.task_done()
+
+    async def join(self):
+        if self._queue is not None:
+            await self._queue.join()
+
+    def stats(self):
+        return {
+            "depth": self._queue.qsize() if self._queue is not None else 0,
+            "in_flight": len(self.in_flight),
+            "submitted": self.submitted,
+            "duplicates": self.duplicates,
+            "dropped": self.dropped,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "batches": self.batches,
+            "batched": self.batched,
+            "stages": {stage: timer.stats() for stage, timer in self.timers.items()},
+        }
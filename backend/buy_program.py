@@ -1,147 +1,311 @@
 import asyncio
+import json
 import logging
-import struct
 from datetime import datetime
-from main import solana_client, wallet, db, Transaction
-from solders.instruction import Instruction, AccountMeta
+from main import solana_client, blockhash_service, token_accounts, wallet, persistence, confirmation_tracker, Transaction
+from config import settings
+from buy_builder import BuyTransactionBuilder
+from position_monitor import PositionMonitor
+from quote_cache import QuoteCache, MAX_COMPUTE_UNITS
+from lookup_table import LookupTableCache
 from solders.message import MessageV0
 from solders.transaction import VersionedTransaction
-from solders.pubkey import Pubkey
-from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price
-from spl.token.constants import TOKEN_PROGRAM_ID
-from spl.token.instructions import get_associated_token_address, create_associated_token_account
 
-async def buy_token(contract_address, group_name):
+buy_builder = BuyTransactionBuilder(
+    wallet.pubkey(),
+    cache_size=settings.buy_cache_size,
+    idempotent_ata=settings.ata_idempotent_create
+)
+quote_cache = QuoteCache(
+    solana_client,
+    cache_size=settings.quote_cache_size,
+    max_age=settings.quote_max_age,
+    slippage=settings.SLIPPAGE_TOLERANCE,
+    unknown_slippage=settings.quote_unknown_slippage,
+    cu_price=settings.cu_price,
+    priority_fee_lamports=settings.priority_fee_lamports,
+    margin=settings.cu_margin,
+    sample_interval=settings.cu_sample_interval,
+    wait_timeout=settings.quote_wait_timeout
+)
+lookup_tables = LookupTableCache(solana_client, settings.lookup_table_addresses)
+
+BUY_AMOUNT_SOL = 0.01
+PACKET_DATA_SIZE = 1232  # Largest serialized transaction the network accepts
+
+def prefetch_quote(contract_address):
+    # Called on detection so reserves are usually cached by the time a worker builds the buy
+    quote_cache.prefetch(buy_builder.derive(contract_address))
+
+def compile_message(instructions, blockhash):
+    # Static pump.fun accounts resolve through the lookup tables when any are loaded
+    return MessageV0.try_compile(
+        payer=wallet.pubkey(),
+        instructions=instructions,
+        address_lookup_table_accounts=lookup_tables.accounts,
+        recent_blockhash=blockhash
+    )
+
+def compile_transaction(instructions, blockhash):
+    return VersionedTransaction(compile_message(instructions, blockhash), [wallet])
+
+def signed_size(message):
+    # Serialized transaction size without signing: signature count, 64 bytes per signer, v0 prefix byte
+    return 2 + 64 * message.header.num_required_signatures + len(bytes(message))
+
+def sample_compute_units(shape, build, blockhash):
+    # Off the hot path: simulate the same instructions under the maximum limit to learn real usage
+    if quote_cache.should_sample(shape):
+        quote_cache.sample(shape, compile_transaction(build((MAX_COMPUTE_UNITS, 0)), blockhash))
+
+
+class BuyOrder:
+    __slots__ = ("contract_address", "group_name", "trace", "mint_accounts", "create_ata", "amount_in_lamports", "shape", "instructions")
+
+    def __init__(self, contract_address, group_name, trace=None):
+        self.contract_address = contract_address
+        self.group_name = group_name
+        self.trace = trace
+
+        self.mint_accounts = buy_builder.derive(contract_address)
+        # Check/create token account
+        self.create_ata = token_accounts.needs_create(self.mint_accounts.mint)
+        if self.create_ata:
+            logging.info(f"Creating token account: {self.mint_accounts.associated_user}")
+        else:
+            logging.info(f"Token account found: {self.mint_accounts.associated_user}")
+
+        # Calculate amounts: pump.fun buys exactly min_tokens_out and fails if that costs more than max_sol_cost
+        self.amount_in_lamports = int(BUY_AMOUNT_SOL * 1_000_000_000)
+        expected_tokens, slippage = quote_cache.quote(contract_address, self.amount_in_lamports)
+        min_tokens_out = max(int(expected_tokens * (1 - slippage)), 1)
+        max_sol_cost = int(self.amount_in_lamports * (1 + settings.SLIPPAGE_TOLERANCE))
+
+        self.shape = "buy_ata" if self.create_ata else "buy"
+        self.instructions = buy_builder.buy_group(self.mint_accounts, min_tokens_out, max_sol_cost, create_ata=self.create_ata)
+
+    def build(self, compute_budget):
+        return buy_builder.compute_budget_instructions(compute_budget) + self.instructions
+
+    def mark(self, stage):
+        if self.trace is not None:
+            self.trace.mark(stage)
+
+
+def build_batch(orders, blockhash):
+    instructions = buy_builder.compute_budget_instructions(quote_cache.compute_budget(*(order.shape for order in orders)))
+    for order in orders:
+        instructions.extend(order.instructions)
+    return compile_message(instructions, blockhash)
+
+def pack_orders(orders, blockhash):
+    # Grows each transaction one order at a time until the next would overflow a packet;
+    # candidates are sized unsigned and only the final message of each group is signed
+    packed = []
+    start = 0
+    while start < len(orders):
+        end = start + 1
+        message = build_batch(orders[start:end], blockhash)
+        while end < len(orders):
+            candidate = build_batch(orders[start:end + 1], blockhash)
+            if signed_size(candidate) > PACKET_DATA_SIZE:
+                break
+            message = candidate
+            end += 1
+        packed.append((orders[start:end], VersionedTransaction(message, [wallet])))
+        start = end
+    return packed
+
+def record_failed_buy(contract_address, error):
+    persistence.enqueue(Transaction(
+        token_address=contract_address,
+        transaction_type="buy",
+        amount_in_dollars=1.0,
+        amount_in_sol=0.0,
+        status="failed",
+        error=str(error)[:500],
+        timestamp=datetime.now()
+    ))
+
+async def send_orders(orders, tx, blockhash):
     try:
+        for order in orders:
+            order.mark("signed")
+
+        # Debug: Log transaction details
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            for order in orders:
+                buy_ix = order.instructions[-1]
+                logging.debug(f"Transaction details: program_id={buy_ix.program_id}, accounts={[str(acc.pubkey) for acc in buy_ix.accounts]}, data={bytes(buy_ix.data).hex()}")
+
+        # Send transaction
+        signature = (await solana_client.send_transaction(tx)).value
+        for order in orders:
+            order.mark("sent")
+            if order.trace is not None:
+                order.trace.finish()
+        for order in orders:
+            sample_compute_units(order.shape, order.build, blockhash)
+    except Exception as e:
+        for order in orders:
+            logging.error(f"Error buying token {order.contract_address}: {e}", exc_info=True)
+            print(f"Error buying token {order.contract_address}: {e}")
+            record_failed_buy(order.contract_address, e)
+        return [e] * len(orders)
+
+    # Record in DB: one row per mint, all sharing the transaction's signature
+    results = []
+    for order in orders:
+        logging.info(f"Buy transaction completed for {order.contract_address}, signature: {signature}")
+        print(f"Buy transaction completed for {order.contract_address}, signature: {signature}")
+        persistence.enqueue(Transaction(
+            token_address=order.contract_address,
+            transaction_type="buy",
+            amount_in_dollars=1.0,
+            amount_in_sol=BUY_AMOUNT_SOL,
+            status="sent",
+            signature=str(signature),
+            timings=json.dumps(order.trace.timings()) if order.trace is not None and settings.record_timings else None,
+            timestamp=datetime.now()
+        ))
+        results.append({"token_bought": order.contract_address, "status": "sent", "signature": signature})
+
+    confirmation_tracker.track(signature, on_confirmed=buys_confirmed(
+        [(order.contract_address, order.amount_in_lamports, 1.0) for order in orders]
+    ))
+    return results
+
+def buys_confirmed(buys):
+    # Callback for a landed buy transaction; `buys` holds (contract_address, cost_lamports, cost_dollars).
+    # The ATA only exists once the transaction lands; until then later buys keep the idempotent create
+    def on_confirmed():
+        for contract_address, cost_lamports, cost_dollars in buys:
+            token_accounts.mark_created(buy_builder.derive(contract_address).mint)
+            position_monitor.add(contract_address, cost_lamports, cost_dollars)
+    return on_confirmed
+
+def restored_confirmation(rows):
+    # on_confirmed for a signature re-tracked after a restart, see ConfirmationTracker.restore
+    buys = [(row.token_address, row.amount_in_sol * 1e9, row.amount_in_dollars) for row in rows if row.transaction_type == "buy"]
+    return buys_confirmed(buys) if buys else None
+
+async def buy_tokens(batch):
+    """Buys every (contract_address, group_name, trace) in `batch`.
+
+    Mints are packed into as few transactions as fit PACKET_DATA_SIZE, each
+    with one compute budget covering all of its buys. A transaction lands or
+    fails as a whole. Returns one result per entry, in order; a failed entry
+    holds its exception instead of a dict.
+    """
+    results = {}
+    orders = []
+    # Only waits when QUOTE_WAIT_TIMEOUT opts in; otherwise unfetched mints are quoted from the initial curve
+    await quote_cache.wait([contract_address for contract_address, _, _ in batch])
+    for contract_address, group_name, trace in batch:
         logging.info(f"Attempting to buy token: {contract_address} in {group_name}")
         print(f"Attempting to buy token: {contract_address} in {group_name}")
+        try:
+            order = BuyOrder(contract_address, group_name, trace)
+        except Exception as e:
+            logging.error(f"Error buying token {contract_address}: {e}", exc_info=True)
+            print(f"Error buying token {contract_address}: {e}")
+            record_failed_buy(contract_address, e)
+            results[contract_address] = e
+            continue
+        order.mark("tx_built")
+        orders.append(order)
 
-        # Pump.fun constants
-        pump_fun_program_id = Pubkey.from_string("6EF8rrecthR5Dkzon8Nwu78hRvfH8m3mH6WxsPvaRNW")
-        global_account = Pubkey.from_string("4wTV1YmiEkRvAtNtw9NZuPEqXhhX5vEiqWpXhF6bbPSM")
-        fee_recipient = Pubkey.from_string("CebN5WGQ4jvKTPtTangStie375uDF1dVtaudpGZaJmvA")
-        event_authority = Pubkey.from_string("Ce6TQqeH7tMRFdodFKmDAU6k42nNiHY8RWG9S5RWK6s")
-        token_mint = Pubkey.from_string(contract_address)
-        payer = wallet.pubkey()
-        amount_in_sol = 0.01  # 0.01 SOL
-        slippage = 5  # 5% slippage
-
-        # Bonding curve and associated token account
-        bonding_curve = Pubkey.find_program_address(
-            [b"bonding-curve", bytes(token_mint)],
-            pump_fun_program_id
-        )[0]
-        associated_bonding_curve = get_associated_token_address(bonding_curve, token_mint)
-        associated_user = get_associated_token_address(payer, token_mint)
-
-        # System accounts
-        system_program = Pubkey.from_string("11111111111111111111111111111111")
-        rent_sysvar = Pubkey.from_string("SysvarRent111111111111111111111111111111111")
-
-        # Check/create token account
-        token_account_instruction = None
+    if orders:
         try:
-            account_info = await solana_client.get_token_accounts_by_owner(payer, token_mint)
-            if not account_info.value:
-                token_account_instruction = create_associated_token_account(payer, payer, token_mint)
-                logging.info(f"Creating token account: {associated_user}")
-            else:
-                logging.info(f"Token account found: {associated_user}")
+            blockhash = await blockhash_service.get_blockhash()
+            for order in orders:
+                order.mark("blockhash_obtained")
+            packed = pack_orders(orders, blockhash)
+            if len(packed) < len(orders):
+                logging.info(f"Packed {len(orders)} buys into {len(packed)} transaction(s)")
         except Exception as e:
-            logging.warning(f"Token account check failed, creating new: {e}")
-            token_account_instruction = create_associated_token_account(payer, payer, token_mint)
-
-        # Calculate amounts
-        sol_dec = 1_000_000_000  # 1 SOL in lamports
-        amount_in_lamports = int(amount_in_sol * sol_dec)
-        max_sol_cost = int(amount_in_lamports * (1 + slippage / 100))  # Slippage adjustment
-        min_tokens_out = 1  # Minimum tokens (avoid 0)
-
-        # Instruction data
-        data = bytearray()
-        data.extend(bytes.fromhex("66063d1201daebea"))  # Buy discriminator
-        data.extend(struct.pack('<Q', min_tokens_out))  # Min tokens out
-        data.extend(struct.pack('<Q', max_sol_cost))  # Max SOL cost
-
-        # Accounts (12, aligned with pump_fun_py)
-        accounts = [
-            AccountMeta(pubkey=global_account, is_signer=False, is_writable=False),  # 0: Global
-            AccountMeta(pubkey=fee_recipient, is_signer=False, is_writable=True),  # 1: Fee recipient
-            AccountMeta(pubkey=token_mint, is_signer=False, is_writable=False),  # 2: Mint
-            AccountMeta(pubkey=bonding_curve, is_signer=False, is_writable=True),  # 3: Bonding curve
-            AccountMeta(pubkey=associated_bonding_curve, is_signer=False, is_writable=True),  # 4: Bonding curve ATA
-            AccountMeta(pubkey=associated_user, is_signer=False, is_writable=True),  # 5: User ATA
-            AccountMeta(pubkey=payer, is_signer=True, is_writable=True),  # 6: User
-            AccountMeta(pubkey=system_program, is_signer=False, is_writable=False),  # 7: System program
-            AccountMeta(pubkey=TOKEN_PROGRAM_ID, is_signer=False, is_writable=False),  # 8: Token program
-            AccountMeta(pubkey=rent_sysvar, is_signer=False, is_writable=False),  # 9: Rent sysvar
-            AccountMeta(pubkey=event_authority, is_signer=False, is_writable=False),  # 10: Event authority
-            AccountMeta(pubkey=pump_fun_program_id, is_signer=False, is_writable=False),  # 11: Program ID
-        ]
-
-        # Instructions
-        instructions = [
-            set_compute_unit_limit(300_000),  # Default compute budget
-            set_compute_unit_price(100_000),  # 0.1 lamports per CU
-        ]
-        if token_account_instruction:
-            instructions.append(token_account_instruction)
-        instructions.append(Instruction(
-            program_id=pump_fun_program_id,
-            accounts=accounts,
-            data=bytes(data)
-        ))
+            packed = []
+            for order in orders:
+                logging.error(f"Error buying token {order.contract_address}: {e}", exc_info=True)
+                print(f"Error buying token {order.contract_address}: {e}")
+                record_failed_buy(order.contract_address, e)
+                results[order.contract_address] = e
+        sent = await asyncio.gather(*(send_orders(group, tx, blockhash) for group, tx in packed))
+        for (group, _), group_results in zip(packed, sent):
+            for order, result in zip(group, group_results):
+                results[order.contract_address] = result
+    return [results[contract_address] for contract_address, _, _ in batch]
 
-        # Build and send transaction
-        blockhash = (await solana_client.get_latest_blockhash()).value.blockhash
-        message = MessageV0.try_compile(
-            payer=payer,
-            instructions=instructions,
-            address_lookup_table_accounts=[],
-            recent_blockhash=blockhash
-        )
-        tx = VersionedTransaction(message, [wallet])
+async def buy_token(contract_address, group_name, trace=None):
+    result = (await buy_tokens([(contract_address, group_name, trace)]))[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
 
-        # Debug: Log transaction details
-        logging.info(f"Transaction details: program_id={pump_fun_program_id}, accounts={[str(acc.pubkey) for acc in accounts]}, data={data.hex()}")
+async def sell_token(position, amount, min_sol_output, expected_lamports, reason):
+    contract_address = position.token_address
+    # Dollar value scaled from what the buy cost, so the dashboard's profit figure stays comparable
+    amount_in_sol = expected_lamports / 1e9
+    amount_in_dollars = position.cost_dollars * expected_lamports / position.cost_lamports if position.cost_lamports else 0.0
+    try:
+        logging.info(f"Attempting to sell {amount} of {contract_address} ({reason})")
+        print(f"Attempting to sell {amount} of {contract_address} ({reason})")
 
-        # Send transaction
+        build = lambda compute_budget: buy_builder.build_sell_instructions(
+            position.mint_accounts, amount, min_sol_output, compute_budget=compute_budget
+        )
+        blockhash = await blockhash_service.get_blockhash()
+        tx = compile_transaction(build(quote_cache.compute_budget("sell")), blockhash)
         signature = (await solana_client.send_transaction(tx)).value
+        sample_compute_units("sell", build, blockhash)
+
+        logging.info(f"Sell transaction sent for {contract_address}, signature: {signature}")
+        print(f"Sell transaction sent for {contract_address}, signature: {signature}")
 
-        logging.info(f"Buy transaction completed for {contract_address}, signature: {signature}")
-        print(f"Buy transaction completed for {contract_address}, signature: {signature}")
-
-        # Record in DB
-        with db.session() as session:
-            new_tx = Transaction(
-                token_address=contract_address,
-                transaction_type="buy",
-                amount_in_dollars=1.0,
-                amount_in_sol=amount_in_sol,
-                status="success",
-                signature=str(signature),
-                timestamp=datetime.now()
-            )
-            session.add(new_tx)
-            session.commit()
-
-        return {"token_bought": contract_address, "status": "success", "signature": signature}
+        persistence.enqueue(Transaction(
+            token_address=contract_address,
+            transaction_type="sell",
+            amount_in_dollars=amount_in_dollars,
+            amount_in_sol=amount_in_sol,
+            status="sent",
+            signature=str(signature),
+            timestamp=datetime.now()
+        ))
+        confirmation_tracker.track(signature)
+        return {"token_sold": contract_address, "status": "sent", "signature": signature, "reason": reason}
 
     except Exception as e:
-        logging.error(f"Error buying token {contract_address}: {e}", exc_info=True)
-        print(f"Error buying token {contract_address}: {e}")
-        
-        with db.session() as session:
-            new_tx = Transaction(
-                token_address=contract_address,
-                transaction_type="buy",
-                amount_in_dollars=1.0,
-                amount_in_sol=0.0,
-                status="failed",
-                error=str(e),
-                timestamp=datetime.now()
-            )
-            session.add(new_tx)
-            session.commit()
-        
+        logging.error(f"Error selling token {contract_address}: {e}", exc_info=True)
+        print(f"Error selling token {contract_address}: {e}")
+
+        persistence.enqueue(Transaction(
+            token_address=contract_address,
+            transaction_type="sell",
+            amount_in_dollars=0.0,
+            amount_in_sol=0.0,
+            status="failed",
+            error=str(e)[:500],
+            timestamp=datetime.now()
+        ))
+
         raise
+
+def save_entry_price(token_address, entry_price):
+    persistence.enqueue(lambda session: session.execute(
+        Transaction.__table__.update()
+        .where(Transaction.token_address == token_address, Transaction.transaction_type == "buy")
+        .values(entry_price=entry_price)
+    ))
+
+position_monitor = PositionMonitor(
+    solana_client,
+    buy_builder,
+    sell_token,
+    profit_threshold=settings.PROFIT_THRESHOLD,
+    sell_profit_factor=settings.SELL_PROFIT_FACTOR,
+    loss_threshold=settings.LOSS_THRESHOLD,
+    slippage=settings.SLIPPAGE_TOLERANCE,
+    tick_interval=settings.position_tick_interval,
+    sell_cooldown=settings.position_sell_cooldown,
+    on_entry_price=save_entry_price
+)
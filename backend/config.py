@@ -12,10 +12,58 @@ class Settings:
     secret_key = os.getenv("secret_key")
     database_uri = os.getenv("DATABASE_URI", f"sqlite:///{Path(__file__).parent / 'app.db'}")
     cors_allowed_origins = os.getenv("CORS_ALLOWED_ORIGINS")
+    api_default_limit = int(os.getenv("API_DEFAULT_LIMIT", 500))  # Rows per /api/contracts or /api/transactions page
+    api_max_limit = int(os.getenv("API_MAX_LIMIT", 5000))
+    summary_cache_seconds = float(os.getenv("SUMMARY_CACHE_SECONDS", 5))  # How long /api/summary reuses its whole-table aggregates
+    api_stream_chunk = int(os.getenv("API_STREAM_CHUNK", 1000))  # Rows fetched per chunk when exporting
+    event_bus_url = os.getenv("EVENT_BUS_URL")  # redis://... to use Redis pub/sub instead of a pipe
+    event_bus_coalesce_window = float(os.getenv("EVENT_BUS_COALESCE_WINDOW", 0.05))  # Seconds of events merged per Socket.IO frame
+    event_bus_max_pending = int(os.getenv("EVENT_BUS_MAX_PENDING", 1000))  # Events buffered before the oldest are dropped
+    metrics_push_interval = float(os.getenv("METRICS_PUSH_INTERVAL", 5))  # Seconds between monitor metric snapshots
+    record_timings = os.getenv("RECORD_TIMINGS", "true").lower() == "true"  # Store stage timings on Transaction rows
     session_name = "telegram_monitor"
+    monitor_sessions = [name.strip() for name in os.getenv("MONITOR_SESSIONS", "telegram_monitor_session").split(",") if name.strip()]  # One shard process per session
     groups_file = Path("groups.txt")
+    groups_reload_interval = float(os.getenv("GROUPS_RELOAD_INTERVAL", 5))  # Seconds between groups.txt mtime checks
+    detection_queue_size = int(os.getenv("DETECTION_QUEUE_SIZE", 10_000))  # Detections buffered between shards and the consumer
+    watermarks_file = Path("watermarks.json")  # Last fetched message id per group
+    poll_interval = float(os.getenv("POLL_INTERVAL", 60))  # Seconds between catch-up polls
+    poll_concurrency = int(os.getenv("POLL_CONCURRENCY", 8))  # Groups polled at once
+    poll_initial_limit = int(os.getenv("POLL_INITIAL_LIMIT", 5))  # Messages read from a group without a watermark
+    poll_batch_limit = int(os.getenv("POLL_BATCH_LIMIT", 100))  # Max new messages read per group per poll
     log_dir = Path("logs")
     wallet_private_key = os.getenv("WALLET_PRIVATE_KEY")
+    rpc_endpoints = [url.strip() for url in os.getenv("RPC_ENDPOINTS", "https://api.mainnet-beta.solana.com").split(",") if url.strip()]
+    rpc_ws_url = os.getenv("RPC_WS_URL")  # Websocket for the wallet subscription, defaults to the first endpoint
+    balance_poll_interval = float(os.getenv("BALANCE_POLL_INTERVAL", 10))  # Seconds between getBalance calls while the websocket is down
+    rpc_send_fanout = int(os.getenv("RPC_SEND_FANOUT", 0))  # Endpoints per sendTransaction, 0 = all
+    address_min_length = int(os.getenv("ADDRESS_MIN_LENGTH", 43))  # Shortest base58 run treated as a mint
+    pump_only = os.getenv("PUMP_ONLY", "false").lower() == "true"  # Only accept vanity mints ending in "pump"
+    seen_contracts_size = int(os.getenv("SEEN_CONTRACTS_SIZE", 100_000))  # Addresses kept in the in-memory dedup index
+    db_batch_size = int(os.getenv("DB_BATCH_SIZE", 100))  # Rows per write-behind commit
+    db_flush_interval = float(os.getenv("DB_FLUSH_INTERVAL", 0.25))  # Seconds a batch may wait to fill up
+    db_queue_size = int(os.getenv("DB_QUEUE_SIZE", 10_000))  # Queued rows before enqueue spills into the overflow deque
+    buy_concurrency = int(os.getenv("BUY_CONCURRENCY", 4))  # Parallel buy workers
+    buy_rate_limit = float(os.getenv("BUY_RATE_LIMIT", 0))  # Max buys per second across workers, 0 = unlimited
+    buy_batch_size = int(os.getenv("BUY_BATCH_SIZE", 1))  # Queued mints packed into one buy transaction, 1 = no batching
+    lookup_table_addresses = [address.strip() for address in os.getenv("LOOKUP_TABLE_ADDRESSES", "").split(",") if address.strip()]  # Created with lookup_table.py
+    buy_cache_size = int(os.getenv("BUY_CACHE_SIZE", 1024))  # Mints with memoized PDA/ATA derivations
+    blockhash_refresh_interval = float(os.getenv("BLOCKHASH_REFRESH_INTERVAL", 2.0))  # Seconds between background refreshes
+    ata_idempotent_create = os.getenv("ATA_IDEMPOTENT_CREATE", "true").lower() == "true"  # CreateIdempotent instead of Create
+    confirm_poll_interval = float(os.getenv("CONFIRM_POLL_INTERVAL", 1.0))  # Seconds between getSignatureStatuses sweeps
+    confirm_expire_after = float(os.getenv("CONFIRM_EXPIRE_AFTER", 90.0))  # Seconds before an unseen signature is marked expired
+    blockhash_max_age = float(os.getenv("BLOCKHASH_MAX_AGE", 20.0))  # Older cached hashes are fetched inline
+    quote_cache_size = int(os.getenv("QUOTE_CACHE_SIZE", 4096))  # Bonding curves kept for local buy quotes
+    quote_max_age = float(os.getenv("QUOTE_MAX_AGE", 2.0))  # Seconds cached reserves count as fresh
+    quote_wait_timeout = float(os.getenv("QUOTE_WAIT_TIMEOUT", 0))  # Seconds a buy may wait on an in-flight curve prefetch, 0 = never
+    quote_unknown_slippage = float(os.getenv("QUOTE_UNKNOWN_SLIPPAGE", 0.25))  # Token shortfall accepted without fresh reserves
+    cu_price = int(os.getenv("CU_PRICE", 100_000))  # Micro-lamports per compute unit; the fee shrinks with the learned limit
+    priority_fee_lamports = int(os.getenv("PRIORITY_FEE_LAMPORTS", 0))  # Fixed priority fee per transaction spread over the CU limit instead, 0 = off
+    cu_margin = float(os.getenv("CU_MARGIN", 0.15))  # Headroom over the largest simulated CU sample
+    cu_sample_interval = float(os.getenv("CU_SAMPLE_INTERVAL", 60))  # Seconds between simulateTransaction samples per shape
+    position_monitor_enabled = os.getenv("POSITION_MONITOR", "true").lower() == "true"  # Auto-sell on the thresholds below
+    position_tick_interval = float(os.getenv("POSITION_TICK_INTERVAL", 0.5))  # Seconds between portfolio repricings
+    position_sell_cooldown = float(os.getenv("POSITION_SELL_COOLDOWN", 15.0))  # Seconds before a sold position is re-evaluated
     BUY_DOLLAR_VALUE = 0.5
     SLIPPAGE_TOLERANCE = 0.05  # 5%
     PROFIT_THRESHOLD = 2.0  # 2x
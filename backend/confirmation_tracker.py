@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam
+from solders.signature import Signature
+from solders.transaction_status import TransactionConfirmationStatus
+from metrics import metrics
+
+MAX_SIGNATURES_PER_CALL = 256  # getSignatureStatuses limit
+LANDED = (TransactionConfirmationStatus.Confirmed, TransactionConfirmationStatus.Finalized)
+
+
+class PendingSignature:
+    __slots__ = ("signature", "sent_at", "on_confirmed")
+
+    def __init__(self, signature, sent_at, on_confirmed=None):
+        self.signature = signature
+        self.sent_at = sent_at
+        self.on_confirmed = on_confirmed
+
+
+class ConfirmationTracker:
+    """Reconciles sent transactions with what actually landed.
+
+    `track` registers a signature right after sendTransaction. Every
+    `poll_interval` seconds all pending signatures are checked with
+    getSignatureStatuses, up to 256 per call. Resolved rows are written back to
+    the Transaction table as one executemany UPDATE through the persistence
+    writer: "confirmed" or "failed" with the slot and send-to-confirm latency,
+    or "expired" when nothing shows up within `expire_after` seconds (the
+    blockhash the transaction was built with has lapsed by then).
+    """
+
+    def __init__(self, client, persistence, model, poll_interval=1.0, expire_after=90.0, publisher=None):
+        self.client = client
+        self.persistence = persistence
+        self.table = model.__table__
+        self.poll_interval = poll_interval
+        self.expire_after = expire_after
+        self.publisher = publisher
+        self.pending = {}  # signature str -> PendingSignature
+        self.tracked = 0
+        self.confirmed = 0
+        self.failed = 0
+        self.expired = 0
+        self.polls = 0
+        self.rpc_calls = 0
+        self.poll_errors = 0
+        self.last_confirm_seconds = 0.0
+        self.total_confirm_seconds = 0.0
+        self._task = None
+        self._update = (
+            self.table.update()
+            .where(self.table.c.signature == bindparam("b_signature"))
+            .values(status=bindparam("b_status"), slot=bindparam("b_slot"),
+                    confirm_latency_ms=bindparam("b_latency_ms"), error=bindparam("b_error"))
+        )
+
+    def track(self, signature, sent_at=None, on_confirmed=None):
+        signature = str(signature)
+        self.pending[signature] = PendingSignature(signature, sent_at or time.monotonic(), on_confirmed)
+        self.tracked += 1
+
+    def restore(self, session, model, on_confirmed=None):
+        # Re-tracks rows still "sent" from a previous run; those older than expire_after can no longer land.
+        # on_confirmed(rows) returns the callback for the rows sharing one signature, or None
+        cutoff = datetime.now() - timedelta(seconds=self.expire_after)
+        rows = session.query(model).filter(
+            model.status == "sent", model.signature.isnot(None), model.timestamp >= cutoff
+        ).all()
+        by_signature = {}
+        for row in rows:
+            by_signature.setdefault(row.signature, []).append(row)
+        now = time.monotonic()
+        for signature, group in by_signature.items():
+            if signature not in self.pending:
+                sent_at = now - (datetime.now() - group[0].timestamp).total_seconds()
+                self.track(signature, sent_at=sent_at, on_confirmed=on_confirmed(group) if on_confirmed else None)
+        expired = session.execute(
+            self.table.update()
+            .where(self.table.c.status == "sent", self.table.c.timestamp < cutoff)
+            .values(status="expired", error="Not confirmed before the blockhash expired")
+        ).rowcount
+        session.commit()
+        self.expired += expired
+        return len(by_signature), expired
+
+    async def poll(self):
+        if not self.pending:
+            return 0
+        self.polls += 1
+        signatures = list(self.pending)
+        results = []
+        for i in range(0, len(signatures), MAX_SIGNATURES_PER_CALL):
+            chunk = signatures[i:i + MAX_SIGNATURES_PER_CALL]
+            response = await self.client.get_signature_statuses([Signature.from_string(s) for s in chunk])
+            self.rpc_calls += 1
+            results.extend(zip(chunk, response.value))
+
+        now = time.monotonic()
+        updates = []
+        for signature, status in results:
+            entry = self.pending.get(signature)
+            if entry is None:
+                continue
+            elapsed = now - entry.sent_at
+            if status is None or (status.err is None and status.confirmation_status not in LANDED):
+                if elapsed > self.expire_after:
+                    updates.append(self._resolve(entry, "expired", None, elapsed, "Not confirmed before the blockhash expired"))
+                continue
+            if status.err is not None:
+                updates.append(self._resolve(entry, "failed", status.slot, elapsed, str(status.err)[:500]))
+            else:
+                updates.append(self._resolve(entry, "confirmed", status.slot, elapsed, None))
+
+        if updates:
+            self.persistence.enqueue(lambda session, rows=updates: session.execute(self._update, rows))
+        return len(updates)
+
+    def _resolve(self, entry, status, slot, elapsed, error):
+        del self.pending[entry.signature]
+        if status == "confirmed":
+            self.confirmed += 1
+            self.last_confirm_seconds = elapsed
+            self.total_confirm_seconds += elapsed
+            metrics.observe("xcute_confirm_seconds", elapsed, "Send to confirmed commitment")
+            if entry.on_confirmed is not None:
+                entry.on_confirmed()
+        elif status == "failed":
+            self.failed += 1
+        else:
+            self.expired += 1
+        latency_ms = round(elapsed * 1000, 1) if slot is not None else None
+        logging.info(f"Transaction {entry.signature} {status} (slot {slot}, {elapsed:.2f}s after send)")
+        if self.publisher is not None:
+            self.publisher.emit("transaction_status", {
+                "signature": entry.signature, "status": status, "slot": slot,
+                "confirm_latency_ms": latency_ms, "timestamp": datetime.now().isoformat()
+            })
+        return {"b_signature": entry.signature, "b_status": status, "b_slot": slot, "b_latency_ms": latency_ms, "b_error": error}
+
+    async def run(self):
+        while True:
+            try:
+                await self.poll()
+            except Exception as e:
+                self.poll_errors += 1
+                logging.warning(f"Signature status poll failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        resolved = self.confirmed + self.failed + self.expired
+        return {
+            "pending": len(self.pending),
+            "tracked": self.tracked,
+            "confirmed": self.confirmed,
+            "failed": self.failed,
+            "expired": self.expired,
+            "landing_rate": round(self.confirmed / resolved, 4) if resolved else 0.0,
+            "polls": self.polls,
+            "rpc_calls": self.rpc_calls,
+            "poll_errors": self.poll_errors,
+            "last_confirm_ms": round(self.last_confirm_seconds * 1000, 1),
+            "avg_confirm_ms": round(self.total_confirm_seconds / self.confirmed * 1000, 1) if self.confirmed else 0.0,
+        }
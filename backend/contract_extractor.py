@@ -0,0 +1,64 @@
+import re
+from solders.pubkey import Pubkey
+
+# Base58 run not embedded in a longer alphanumeric run (e.g. an 88-char signature); compiled once at import
+ADDRESS_PATTERN = re.compile(r"(?<![0-9A-Za-z])[1-9A-HJ-NP-Za-km-z]{32,44}(?![0-9A-Za-z])")
+
+# Well-known addresses that show up in chats but are never a new token to buy
+KNOWN_ADDRESSES = frozenset({
+    "So11111111111111111111111111111111111111112",  # Wrapped SOL
+    "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v",  # USDC
+    "Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB",  # USDT
+    "6EF8rrecthR5Dkzon8Nwu78hRvfH8m3mH6WxsPvaRNW",  # Pump.fun program
+    "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA",  # Token program
+    "ATokenGPvbdGVxr1b2hvZbsiqW5xWH25efTNsLJA8knL",  # Associated token program
+})
+
+
+class ContractExtractor:
+    """Pulls candidate token mints out of message text.
+
+    A match must be a base58 run that decodes to exactly 32 bytes. With
+    `pump_only` set, only vanity pump.fun mints (ending in "pump") are kept.
+    Repeats within one message are returned once, in order of appearance.
+    """
+
+    def __init__(self, min_length=43, pump_only=False, ignored=KNOWN_ADDRESSES):
+        self.min_length = min_length
+        self.pump_only = pump_only
+        self.ignored = ignored
+        self.messages = 0
+        self.prefiltered = 0
+        self.candidates = 0
+        self.rejected = 0
+
+    def extract(self, text):
+        self.messages += 1
+        # Cheap prefilter: too short to hold an address, or no pump suffix when that is required
+        if not text or len(text) < self.min_length or (self.pump_only and "pump" not in text):
+            self.prefiltered += 1
+            return []
+
+        found = []
+        for candidate in ADDRESS_PATTERN.findall(text):
+            if len(candidate) < self.min_length or candidate in found:
+                continue
+            self.candidates += 1
+            if candidate in self.ignored or (self.pump_only and not candidate.endswith("pump")):
+                self.rejected += 1
+                continue
+            try:
+                Pubkey.from_string(candidate)  # Rejects runs that do not decode to 32 bytes
+            except ValueError:
+                self.rejected += 1
+                continue
+            found.append(candidate)
+        return found
+
+    def stats(self):
+        return {
+            "messages": self.messages,
+            "prefiltered": self.prefiltered,
+            "candidates": self.candidates,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,52 @@
+from collections import OrderedDict
+
+
+class SeenAddressIndex:
+    """Bounded LRU of contract addresses already stored in the database.
+
+    A hit means the address is known and needs no DB round trip. A miss is not
+    proof the address is new (it may have been evicted), which is why inserts
+    are still guarded by the unique index on Contract.address.
+    """
+
+    def __init__(self, max_size=100_000):
+        self.max_size = max_size
+        self._addresses = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._addresses)
+
+    def __contains__(self, address):
+        return address in self._addresses
+
+    def seen(self, address):
+        if address in self._addresses:
+            self._addresses.move_to_end(address)
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def add(self, address, contract_id=None):
+        self._addresses[address] = contract_id
+        self._addresses.move_to_end(address)
+        if len(self._addresses) > self.max_size:
+            self._addresses.popitem(last=False)
+
+    def discard(self, address):
+        self._addresses.pop(address, None)
+
+    def get_id(self, address):
+        return self._addresses.get(address)
+
+    def warm_load(self, session, model):
+        # Newest rows are the likeliest re-detections, so load them last to keep them hottest
+        rows = session.query(model.id, model.address).order_by(model.id.desc()).limit(self.max_size).all()
+        for contract_id, address in reversed(rows):
+            self.add(address, contract_id)
+        return len(rows)
+
+    def stats(self):
+        return {"size": len(self._addresses), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,192 @@
+import json
+import logging
+import queue
+import threading
+import time
+
+# Events travel from the forked Telegram monitor to the Socket.IO server as
+# (event, data, published_at) tuples. The default transport is the
+# multiprocessing pipe created before the fork; setting EVENT_BUS_URL to a
+# redis:// URL uses Redis pub/sub instead. Any object with the same
+# publish()/pubsub() methods as redis.Redis can stand in for Redis in tests.
+
+
+class PipeTransport:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def send(self, messages):
+        self.conn.send(messages)
+
+    def receive(self, limit):
+        messages = []
+        while len(messages) < limit and self.conn.poll():
+            messages.extend(self.conn.recv())
+        return messages
+
+
+class RedisTransport:
+    def __init__(self, client, channel="xcute:events"):
+        self.client = client
+        self.channel = channel
+        self._pubsub = None
+
+    @classmethod
+    def from_url(cls, url, channel="xcute:events"):
+        import redis  # Optional dependency, only needed when EVENT_BUS_URL is set
+        return cls(redis.Redis.from_url(url), channel)
+
+    def send(self, messages):
+        self.client.publish(self.channel, json.dumps(messages))
+
+    def receive(self, limit):
+        if self._pubsub is None:
+            self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.subscribe(self.channel)
+        messages = []
+        while len(messages) < limit:
+            message = self._pubsub.get_message(timeout=0)
+            if message is None:
+                break
+            messages.extend(tuple(item) for item in json.loads(message["data"]))
+        return messages
+
+
+class EventPublisher:
+    """Monitor-side half of the bus; `emit` never blocks the event loop.
+
+    Events are buffered in a bounded queue and shipped in batches by a sender
+    thread. When the queue is full the oldest queued event is dropped (and
+    counted) to make room, so the web side sees the most recent state.
+    `depth` is the pending backlog between the monitor and the web process.
+    """
+
+    def __init__(self, max_pending=10_000, batch_size=100):
+        self.transport = None
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.published = 0
+        self.dropped = 0
+        self.send_errors = 0
+        self._thread = None
+
+    def connect(self, transport):
+        self.transport = transport
+
+    def emit(self, event, data):
+        if self._thread is None and self.transport is not None:
+            # Started on first use: threads do not survive fork, and the monitor forks its shards before emitting
+            self._thread = threading.Thread(target=self._run, name="event-publisher", daemon=True)
+            self._thread.start()
+        item = (event, data, time.time())
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                break
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+        self.published += 1
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.transport.send(batch)
+            except Exception as e:
+                self.send_errors += 1
+                logging.error(f"Event bus send failed, dropped {len(batch)} events: {e}")
+
+    def stats(self):
+        return {"depth": self.queue.qsize(), "published": self.published, "dropped": self.dropped, "send_errors": self.send_errors}
+
+
+class EventRelay:
+    """Web-side half of the bus; forwards events to Socket.IO clients.
+
+    Every `coalesce_window` seconds the relay drains up to `max_pending`
+    events from the transport. A single event goes out under its own name;
+    several events of the same name go out as one "<event>_batch" frame
+    holding a list. Anything beyond that stays in the transport, which pushes
+    back on the publisher until its own queue drops events. Neither transport
+    can report its backlog without reading it, so the stats count what each
+    drain returned and how often it hit `max_pending` (a backlog was left);
+    the publisher's `depth` is the pending queue itself.
+    """
+
+    def __init__(self, socketio, coalesce_window=0.05, max_pending=1000):
+        self.socketio = socketio
+        self.transport = None
+        self.coalesce_window = coalesce_window
+        self.max_pending = max_pending
+        self.delivered = 0
+        self.frames = 0
+        self.last_drained = 0
+        self.max_drained = 0
+        self.saturated_drains = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.handlers = {}
+
+    def on(self, event, handler):
+        # Events consumed by the web process itself instead of being forwarded to clients
+        self.handlers[event] = handler
+
+    def relay_once(self):
+        try:
+            messages = self.transport.receive(self.max_pending)
+        except Exception as e:
+            logging.error(f"Event bus receive failed: {e}")
+            return 0
+        self.last_drained = len(messages)
+        self.max_drained = max(self.max_drained, self.last_drained)
+        if self.last_drained >= self.max_pending:
+            self.saturated_drains += 1
+
+        grouped = {}
+        now = time.time()
+        for event, data, published_at in messages:
+            self.last_latency = now - published_at
+            self.max_latency = max(self.max_latency, self.last_latency)
+            handler = self.handlers.get(event)
+            if handler is not None:
+                handler(data)
+                continue
+            grouped.setdefault(event, []).append(data)
+
+        for event, items in grouped.items():
+            if len(items) == 1:
+                self.socketio.emit(event, items[0])
+            else:
+                self.socketio.emit(f"{event}_batch", items)
+            self.frames += 1
+            self.delivered += len(items)
+        return len(messages)
+
+    def run(self):
+        while True:
+            self.relay_once()
+            self.socketio.sleep(self.coalesce_window)
+
+    def start(self, transport):
+        self.transport = transport
+        return self.socketio.start_background_task(self.run)
+
+    def stats(self):
+        return {
+            "last_drained": self.last_drained,
+            "max_drained": self.max_drained,
+            "saturated_drains": self.saturated_drains,
+            "delivered": self.delivered,
+            "frames": self.frames,
+            "last_latency_ms": round(self.last_latency * 1000, 2),
+            "max_latency_ms": round(self.max_latency * 1000, 2),
+        }
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import struct
+import sys
+from solders.address_lookup_table_account import (
+    ID as ADDRESS_LOOKUP_TABLE_PROGRAM_ID,
+    AddressLookupTable,
+    AddressLookupTableAccount,
+    derive_lookup_table_address,
+)
+from solders.compute_budget import ID as COMPUTE_BUDGET_PROGRAM_ID
+from solders.instruction import Instruction, AccountMeta
+from solders.pubkey import Pubkey
+from spl.token.constants import ASSOCIATED_TOKEN_PROGRAM_ID, TOKEN_PROGRAM_ID
+from buy_builder import (
+    PUMP_FUN_PROGRAM_ID,
+    GLOBAL_ACCOUNT,
+    FEE_RECIPIENT,
+    EVENT_AUTHORITY,
+    SYSTEM_PROGRAM,
+    RENT_SYSVAR,
+)
+
+# Every key a pump.fun buy or sell carries that is the same for all mints.
+# MessageV0.try_compile keeps invoked programs and signers static and loads the
+# rest through the table.
+STATIC_ACCOUNTS = [
+    GLOBAL_ACCOUNT,
+    FEE_RECIPIENT,
+    EVENT_AUTHORITY,
+    SYSTEM_PROGRAM,
+    TOKEN_PROGRAM_ID,
+    RENT_SYSVAR,
+    PUMP_FUN_PROGRAM_ID,
+    ASSOCIATED_TOKEN_PROGRAM_ID,
+    COMPUTE_BUDGET_PROGRAM_ID,
+]
+
+CREATE_LOOKUP_TABLE = 0
+EXTEND_LOOKUP_TABLE = 2
+
+
+def create_lookup_table_instruction(authority, payer, recent_slot):
+    table, bump = derive_lookup_table_address(authority, recent_slot)
+    instruction = Instruction(
+        program_id=ADDRESS_LOOKUP_TABLE_PROGRAM_ID,
+        accounts=[
+            AccountMeta(pubkey=table, is_signer=False, is_writable=True),
+            AccountMeta(pubkey=authority, is_signer=True, is_writable=False),
+            AccountMeta(pubkey=payer, is_signer=True, is_writable=True),
+            AccountMeta(pubkey=SYSTEM_PROGRAM, is_signer=False, is_writable=False),
+        ],
+        data=struct.pack("<IQB", CREATE_LOOKUP_TABLE, recent_slot, bump)
+    )
+    return table, instruction
+
+
+def extend_lookup_table_instruction(table, authority, payer, addresses):
+    return Instruction(
+        program_id=ADDRESS_LOOKUP_TABLE_PROGRAM_ID,
+        accounts=[
+            AccountMeta(pubkey=table, is_signer=False, is_writable=True),
+            AccountMeta(pubkey=authority, is_signer=True, is_writable=False),
+            AccountMeta(pubkey=payer, is_signer=True, is_writable=True),
+            AccountMeta(pubkey=SYSTEM_PROGRAM, is_signer=False, is_writable=False),
+        ],
+        data=struct.pack("<IQ", EXTEND_LOOKUP_TABLE, len(addresses)) + b"".join(bytes(address) for address in addresses)
+    )
+
+
+async def fetch_lookup_table(client, address):
+    account = (await client.get_account_info(address)).value
+    if account is None:
+        raise ValueError(f"Lookup table {address} does not exist")
+    return AddressLookupTableAccount(address, list(AddressLookupTable.deserialize(bytes(account.data)).addresses))
+
+
+class LookupTableCache:
+    """Address lookup tables the buy and sell transactions compile against.
+
+    Loaded once at startup from LOOKUP_TABLE_ADDRESSES. `accounts` is what
+    MessageV0.try_compile takes; it stays empty (full static keys, as before)
+    when no table is configured or the fetch fails.
+    """
+
+    def __init__(self, client, addresses):
+        self.client = client
+        self.addresses = [Pubkey.from_string(address) for address in addresses]
+        self.accounts = []
+        self.missing = []
+
+    async def load(self):
+        if not self.addresses:
+            return []
+        accounts = []
+        for address in self.addresses:
+            try:
+                accounts.append(await fetch_lookup_table(self.client, address))
+            except Exception as e:
+                logging.error(f"Could not load lookup table {address}: {e}")
+        covered = {key for account in accounts for key in account.addresses}
+        self.missing = [key for key in STATIC_ACCOUNTS if key not in covered]
+        if accounts and self.missing:
+            logging.warning(f"Lookup tables lack {len(self.missing)} static accounts; run python lookup_table.py extend <table>")
+        self.accounts = accounts
+        return accounts
+
+    def stats(self):
+        return {
+            "tables": len(self.accounts),
+            "addresses": sum(len(account.addresses) for account in self.accounts),
+            "missing_static": len(self.missing),
+        }
+
+
+async def main(argv):
+    # Maintenance CLI, signed by WALLET_PRIVATE_KEY:
+    #   python lookup_table.py create         create a table holding STATIC_ACCOUNTS
+    #   python lookup_table.py extend <table>  add whatever STATIC_ACCOUNTS it lacks
+    #   python lookup_table.py show <table>
+    from main import solana_client, blockhash_service, wallet
+    from solders.message import MessageV0
+    from solders.transaction import VersionedTransaction
+
+    async def send(instructions):
+        message = MessageV0.try_compile(
+            payer=wallet.pubkey(),
+            instructions=instructions,
+            address_lookup_table_accounts=[],
+            recent_blockhash=await blockhash_service.get_blockhash()
+        )
+        return (await solana_client.send_transaction(VersionedTransaction(message, [wallet]))).value
+
+    command = argv[0] if argv else None
+    if command not in ("create", "extend", "show") or (command != "create" and len(argv) < 2):
+        print("Usage: python lookup_table.py create | extend <table> | show <table>")
+        return
+    try:
+        if command == "create":
+            slot = (await solana_client.get_slot(commitment="finalized")).value
+            table, create = create_lookup_table_instruction(wallet.pubkey(), wallet.pubkey(), slot)
+            extend = extend_lookup_table_instruction(table, wallet.pubkey(), wallet.pubkey(), STATIC_ACCOUNTS)
+            signature = await send([create, extend])
+            print(f"Created lookup table {table} ({signature}); set LOOKUP_TABLE_ADDRESSES={table}")
+        elif command == "extend":
+            table = Pubkey.from_string(argv[1])
+            present = set((await fetch_lookup_table(solana_client, table)).addresses)
+            missing = [key for key in STATIC_ACCOUNTS if key not in present]
+            if not missing:
+                print(f"Lookup table {table} already holds every static account")
+                return
+            signature = await send([extend_lookup_table_instruction(table, wallet.pubkey(), wallet.pubkey(), missing)])
+            print(f"Added {len(missing)} addresses to {table} ({signature})")
+        else:
+            table = await fetch_lookup_table(solana_client, Pubkey.from_string(argv[1]))
+            for index, address in enumerate(table.addresses):
+                print(f"{index:3} {address}{'' if address in STATIC_ACCOUNTS else '  (not a static pump.fun account)'}")
+    finally:
+        await solana_client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
@@ -1,14 +1,31 @@
-from flask import Flask, jsonify
+import sys
+if __name__ == "__main__":
+    # `python main.py` runs this file as __main__; register it as `main` too so the
+    # `from main import ...` in telegram_monitor and buy_program reuse these objects
+    # (event_publisher above all) instead of loading a second, unconnected copy
+    sys.modules["main"] = sys.modules[__name__]
+
+from flask import Flask, Response, jsonify, request, stream_with_context
+from datetime import datetime
+import json
 from flask_socketio import SocketIO
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from config import settings
-from solana.rpc.async_api import AsyncClient
+from rpc_pool import RpcPool
 import asyncio
 import logging
+import multiprocessing
 import os
+import time
 from solders.keypair import Keypair
-import telegram_monitor
+from blockhash_service import BlockhashService
+from token_accounts import TokenAccountRegistry
+from persistence import PersistenceWriter
+from confirmation_tracker import ConfirmationTracker
+from balance_service import BalanceService, websocket_url
+from event_bus import EventPublisher, EventRelay, PipeTransport, RedisTransport
+from metrics import metrics, render_prometheus
 
 # Ensure log directory exists
 if not os.path.exists(settings.log_dir):
@@ -29,34 +46,86 @@ CORS(app)
 
 class Contract(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    address = db.Column(db.String(44), nullable=False)
+    address = db.Column(db.String(44), nullable=False, unique=True, index=True)
     group = db.Column(db.String(100), nullable=False)
     status = db.Column(db.String(20), nullable=False)
-    timestamp = db.Column(db.DateTime, nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=False, index=True)
 
 class Transaction(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    token_address = db.Column(db.String(44), nullable=False)
+    token_address = db.Column(db.String(44), nullable=False, index=True)
     transaction_type = db.Column(db.String(20), nullable=False)
     amount_in_dollars = db.Column(db.Float, nullable=False)
     amount_in_sol = db.Column(db.Float, nullable=False)
     status = db.Column(db.String(20), nullable=False)
     error = db.Column(db.String(500))
-    signature = db.Column(db.String(88))
-    timestamp = db.Column(db.DateTime, nullable=False)
+    signature = db.Column(db.String(88), index=True)
+    slot = db.Column(db.BigInteger)  # Slot the transaction landed in, set by ConfirmationTracker
+    confirm_latency_ms = db.Column(db.Float)  # Send to confirmed/failed commitment
+    entry_price = db.Column(db.Float)  # Buys only: lamports per token base unit, set by PositionMonitor
+    timings = db.Column(db.Text)  # JSON stage timings in ms since message receipt, see metrics.LatencyTrace
+    timestamp = db.Column(db.DateTime, nullable=False, index=True)
+
+def ensure_schema():
+    # create_all() skips tables that already exist, so add columns and indexes introduced since on their own
+    inspector = db.inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(db.engine.dialect)
+                with db.engine.begin() as connection:
+                    connection.execute(db.text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+                logging.info(f"Added column {table.name}.{column.name}")
+        for index in table.indexes:
+            try:
+                index.create(db.engine, checkfirst=True)
+            except Exception as e:
+                logging.error(f"Could not create index {index.name}: {e}")
+                print(f"Could not create index {index.name}: {e}")
+
+event_publisher = EventPublisher(max_pending=settings.event_bus_max_pending)
+event_relay = EventRelay(
+    socketio,
+    coalesce_window=settings.event_bus_coalesce_window,
+    max_pending=settings.event_bus_max_pending
+)
+monitor_metrics = {}  # Latest snapshot pushed by the monitor process
+event_relay.on("__metrics__", lambda snapshot: monitor_metrics.update(snapshot=snapshot))
 
-solana_client = AsyncClient("https://api.mainnet-beta.solana.com")
+persistence = PersistenceWriter(
+    app, db,
+    batch_size=settings.db_batch_size,
+    flush_interval=settings.db_flush_interval,
+    max_queue=settings.db_queue_size
+)
+
+solana_client = RpcPool(settings.rpc_endpoints, send_fanout=settings.rpc_send_fanout)
 wallet = Keypair.from_base58_string(os.getenv("WALLET_PRIVATE_KEY"))
+blockhash_service = BlockhashService(
+    solana_client,
+    refresh_interval=settings.blockhash_refresh_interval,
+    max_age=settings.blockhash_max_age
+)
+token_accounts = TokenAccountRegistry(solana_client, wallet.pubkey())
+balance_service = BalanceService(
+    solana_client, wallet.pubkey(),
+    settings.rpc_ws_url or websocket_url(settings.rpc_endpoints[0]),
+    poll_interval=settings.balance_poll_interval
+)
+confirmation_tracker = ConfirmationTracker(
+    solana_client, persistence, Transaction,
+    poll_interval=settings.confirm_poll_interval,
+    expire_after=settings.confirm_expire_after,
+    publisher=event_publisher
+)
 
-@app.route("/api/contracts")
-def get_contracts():
-    contracts = Contract.query.all()
-    return jsonify([{"contract": c.address, "group": c.group, "timestamp": c.timestamp.isoformat()} for c in contracts])
+def contract_row(c):
+    return {"id": c.id, "contract": c.address, "group": c.group, "timestamp": c.timestamp.isoformat()}
 
-@app.route("/api/transactions")
-def get_transactions():
-    transactions = Transaction.query.all()
-    return jsonify([{
+def transaction_row(t):
+    return {
+        "id": t.id,
         "token_address": t.token_address,
         "transaction_type": t.transaction_type,
         "amount_in_dollars": t.amount_in_dollars,
@@ -64,19 +133,110 @@ def get_transactions():
         "status": t.status,
         "error": t.error,
         "signature": t.signature,
+        "slot": t.slot,
+        "confirm_latency_ms": t.confirm_latency_ms,
         "timestamp": t.timestamp.isoformat()
-    } for t in transactions])
+    }
+
+def stream_rows(query, serialize):
+    # Rows are fetched and encoded in chunks so exports never hold the whole table in memory
+    yield "["
+    first = True
+    for row in query.yield_per(settings.api_stream_chunk):
+        yield ("" if first else ",") + json.dumps(serialize(row))
+        first = False
+    yield "]"
+
+def paginated_response(model, serialize):
+    """List endpoint with keyset pagination.
+
+    ?after=<id> returns rows with a larger id, ?since=<ISO timestamp> rows newer
+    than that time, and with neither the newest `limit` rows. Rows are always in
+    ascending id order; X-Next-After carries the cursor for the next call.
+    ?export=1 streams every matching row instead.
+    """
+    try:
+        limit = max(1, min(int(request.args.get("limit", settings.api_default_limit)), settings.api_max_limit))
+        after = request.args.get("after", type=int)
+        since = request.args.get("since")
+        since = datetime.fromisoformat(since) if since else None
+    except ValueError as e:
+        return jsonify({"error": f"Invalid pagination parameter: {e}"}), 400
+
+    query = model.query
+    if after is not None:
+        query = query.filter(model.id > after)
+    if since is not None:
+        query = query.filter(model.timestamp > since)
+
+    if request.args.get("export"):
+        return Response(stream_with_context(stream_rows(query.order_by(model.id), serialize)), mimetype="application/json")
+
+    if after is None and since is None:
+        rows = query.order_by(model.id.desc()).limit(limit).all()
+        rows.reverse()
+    else:
+        rows = query.order_by(model.id).limit(limit).all()
+
+    response = jsonify([serialize(row) for row in rows])
+    response.headers["X-Next-After"] = str(rows[-1].id if rows else (after or 0))
+    response.add_etag()
+    return response.make_conditional(request)
+
+@app.route("/api/contracts")
+def get_contracts():
+    return paginated_response(Contract, contract_row)
+
+@app.route("/api/transactions")
+def get_transactions():
+    return paginated_response(Transaction, transaction_row)
+
+summary_cache = {"at": 0.0, "body": None}
+
+@app.route("/api/summary")
+def get_summary():
+    # Dashboard totals over the whole history; the list endpoints only return a page of rows.
+    # The aggregates scan the Transaction table, so every client shares one result per summary_cache_seconds
+    if summary_cache["body"] is not None and time.monotonic() - summary_cache["at"] < settings.summary_cache_seconds:
+        return jsonify(summary_cache["body"])
+    landed = Transaction.status.in_(("confirmed", "success"))
+    rows = db.session.query(
+        Transaction.transaction_type,
+        db.func.count(Transaction.id),
+        db.func.coalesce(db.func.sum(Transaction.amount_in_dollars), 0.0),
+        db.func.count(db.distinct(Transaction.token_address))
+    ).filter(landed).group_by(Transaction.transaction_type).all()
+    totals = {transaction_type: (count, dollars, tokens) for transaction_type, count, dollars, tokens in rows}
+    buys = totals.get("buy", (0, 0.0, 0))
+    sells = totals.get("sell", (0, 0.0, 0))
+    summary_cache["body"] = {
+        "total_contracts": db.session.query(db.func.count(Contract.id)).scalar(),
+        "successful_buys": buys[0],
+        "successful_sells": sells[0],
+        "profit": sells[1] - buys[1],
+        "active_contracts": buys[2],
+    }
+    summary_cache["at"] = time.monotonic()
+    return jsonify(summary_cache["body"])
 
 @app.route("/api/wallet_balance")
-async def get_wallet_balance():
+def get_wallet_balance():
     try:
-        async with AsyncClient("https://api.mainnet-beta.solana.com") as client:
-            balance = (await client.get_balance(wallet.pubkey())).value / 1e9
+        balance = balance_service.balance()
+        if balance is None:
+            return jsonify({"error": "Wallet balance unavailable"}), 503
         return jsonify({"balance": balance})
     except Exception as e:
         logging.error(f"Wallet balance error: {e}", exc_info=True)
         return jsonify({"error": str(e)}), 500
 
+@app.route("/api/metrics")
+def get_metrics():
+    metrics.set_gauges("xcute_event_relay", event_relay.stats())
+    metrics.set_gauges("xcute_wallet_balance", balance_service.stats())
+    body = render_prometheus(metrics.snapshot(), monitor_metrics.get("snapshot"))
+    return Response(body, mimetype="text/plain; version=0.0.4")
+
 @socketio.on("connect")
 def handle_connect():
     logging.info("Client connected")
@@ -86,12 +246,22 @@ def handle_connect():
 def handle_disconnect():
     logging.info("Client disconnected")
 
+def event_bus_transports():
+    if settings.event_bus_url:
+        return (RedisTransport.from_url(settings.event_bus_url), RedisTransport.from_url(settings.event_bus_url))
+    reader, writer = multiprocessing.Pipe(duplex=False)
+    return PipeTransport(reader), PipeTransport(writer)
+
 def run_telegram_monitor():
+    relay_transport, publisher_transport = event_bus_transports()
     pid = os.fork()
     if pid == 0:
+        import telegram_monitor  # Imported here since it imports from this module
+        event_publisher.connect(publisher_transport)
         asyncio.run(telegram_monitor.start_monitoring())
         os._exit(0)
     else:
+        event_relay.start(relay_transport)
         logging.info(f"Telegram monitoring process started with PID: {pid}")
         print(f"Telegram monitoring process started with PID: {pid}")
         return pid
@@ -101,9 +271,13 @@ if __name__ == "__main__":
     print("Initializing database...")
     with app.app_context():
         db.create_all()
+        ensure_schema()
     logging.info("Database tables created.")
 
     telegram_pid = run_telegram_monitor()
+    # Started after the fork so the thread lives in the web process only
+    balance_service.start()
+    balance_service.watch(socketio)
     logging.info("Starting Flask-SocketIO server...")
     print("Starting Flask server...")
     try:
@@ -0,0 +1,153 @@
+import bisect
+import time
+
+# In-process latency histograms rendered in the Prometheus text format.
+# The monitor runs in a forked child, so it pushes `snapshot()` over the event
+# bus and the web process renders its own registry plus the latest child copy.
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        return {"buckets": list(self.buckets), "counts": list(self.counts), "sum": self.sum, "count": self.count}
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.histograms = {}  # (name, labels) -> Histogram
+        self.help = {}
+        self.gauges = {}
+
+    def histogram(self, name, help_text="", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+            self.help.setdefault(name, help_text)
+        return histogram
+
+    def observe(self, name, value, help_text="", **labels):
+        self.histogram(name, help_text, **labels).observe(value)
+
+    def set_gauge(self, name, value, help_text="", **labels):
+        self.gauges[(name, tuple(sorted(labels.items())))] = value
+        self.help.setdefault(name, help_text)
+
+    def set_gauges(self, prefix, stats, **labels):
+        # Flattens a component's stats() dict; non-numeric values are skipped
+        for key, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.set_gauge(f"{prefix}_{key}", value, **labels)
+
+    def snapshot(self):
+        return {
+            "histograms": [[name, list(labels), h.snapshot()] for (name, labels), h in self.histograms.items()],
+            "gauges": [[name, list(labels), value] for (name, labels), value in self.gauges.items()],
+            "help": dict(self.help),
+        }
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+def render_prometheus(*snapshots):
+    lines = []
+    typed = set()
+    for snapshot in snapshots:
+        if not snapshot:
+            continue
+        help_texts = snapshot.get("help", {})
+        for name, labels, value in snapshot["gauges"]:
+            labels = [tuple(label) for label in labels]
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# HELP {name} {help_texts.get(name, '')}")
+                lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name}{_labels(labels)} {value}")
+        for name, labels, histogram in snapshot["histograms"]:
+            labels = [tuple(label) for label in labels]
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# HELP {name} {help_texts.get(name, '')}")
+                lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, count in zip(histogram["buckets"], histogram["counts"]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels + [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(labels + [('le', '+Inf')])} {histogram['count']}")
+            lines.append(f"{name}_sum{_labels(labels)} {histogram['sum']}")
+            lines.append(f"{name}_count{_labels(labels)} {histogram['count']}")
+    return "\n".join(lines) + "\n"
+
+
+class LatencyTrace:
+    """Marks stage times for one detection on its way to a transaction.
+
+    Stages in order: received, text_extracted, regex_matched, handed_off (only
+    when the message came from a shard process), dedup_checked, queued,
+    dequeued, tx_built, blockhash_obtained, signed, sent. `mark` only
+    appends a perf_counter reading; histograms are fed once, in `finish`, with
+    each stage's time since the previous mark and since the message was
+    received.
+    """
+
+    __slots__ = ("marks", "finished")
+
+    def __init__(self, message_date=None, started_at=None):
+        self.marks = [("received", started_at or time.perf_counter())]
+        self.finished = False
+        if message_date is not None:
+            # Telegram message dates have one-second resolution, so this is a coarse figure
+            metrics.observe("xcute_message_delay_seconds", max(time.time() - message_date.timestamp(), 0.0),
+                            "Telegram message date to local receipt")
+
+    @classmethod
+    def from_wall(cls, message_date, marks):
+        # Rebuilds a trace from (stage, time.time()) pairs taken in another process
+        offset = time.perf_counter() - time.time()
+        trace = cls(message_date, marks[0][1] + offset)
+        trace.marks.extend((stage, at + offset) for stage, at in marks[1:])
+        return trace
+
+    def mark(self, stage):
+        self.marks.append((stage, time.perf_counter()))
+
+    def fork(self):
+        # One message can carry several mints; each continues on its own copy
+        trace = LatencyTrace.__new__(LatencyTrace)
+        trace.marks = list(self.marks)
+        trace.finished = False
+        return trace
+
+    def timings(self):
+        start = self.marks[0][1]
+        return {stage: round((at - start) * 1000, 3) for stage, at in self.marks}
+
+    def finish(self, registry=None):
+        if self.finished:
+            return
+        self.finished = True
+        registry = registry or metrics
+        start = previous = self.marks[0][1]
+        for stage, at in self.marks[1:]:
+            registry.observe("xcute_stage_seconds", at - previous, "Time spent reaching each stage from the previous one", stage=stage)
+            registry.observe("xcute_since_received_seconds", at - start, "Time from message receipt to each stage", stage=stage)
+            previous = at
+
+
+metrics = MetricsRegistry()
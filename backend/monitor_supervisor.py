@@ -0,0 +1,350 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import time
+import zlib
+from telethon import TelegramClient, events
+from telethon.tl.types import InputPeerChannel, InputPeerChat, InputPeerUser
+from telethon.utils import get_input_peer, get_peer_id
+from config import settings
+from telegram_monitor import contract_extractor, load_groups, load_watermarks, save_watermarks, scan_message
+
+# Telegram side of the monitor, split across worker processes.
+#
+# Groups are assigned to shards by crc32 of the link, so a group stays on the
+# same session across restarts and reloads. Each worker runs its own
+# TelegramClient session and event loop, turns messages into detections
+# (text extraction and address matching happen here, in parallel) and puts
+# them on one multiprocessing queue. The consumer in telegram_monitor owns
+# dedup, persistence and buying, exactly once for all shards.
+
+
+def shard_for(group, shards):
+    return zlib.crc32(group.strip().rstrip("/").lower().encode()) % shards
+
+
+class GroupList:
+    """groups.txt, re-read whenever its mtime changes."""
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = None
+        self.groups = []
+        self.reloads = 0
+
+    def reload(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self.mtime and self.reloads:
+            return False
+        self.mtime = mtime
+        self.groups = load_groups(self.path)
+        self.reloads += 1
+        return True
+
+
+class EntityCache:
+    """Resolved group entities for one session, persisted as JSON.
+
+    Access hashes are per account, so every session keeps its own file. A
+    cached group is turned back into an InputPeer without any request.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        try:
+            with open(path, "r") as file:
+                self.entries = json.load(file)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.error(f"Error loading entity cache {path}: {e}")
+
+    def get(self, group):
+        entry = self.entries.get(group)
+        if entry is None:
+            self.misses += 1
+            return None, None
+        self.hits += 1
+        kind = entry["type"]
+        if kind == "channel":
+            peer = InputPeerChannel(entry["id"], entry["access_hash"])
+        elif kind == "chat":
+            peer = InputPeerChat(entry["id"])
+        else:
+            peer = InputPeerUser(entry["id"], entry["access_hash"])
+        return peer, entry["title"]
+
+    def put(self, group, entity):
+        peer = get_input_peer(entity)
+        if isinstance(peer, InputPeerChannel):
+            entry = {"type": "channel", "id": peer.channel_id, "access_hash": peer.access_hash}
+        elif isinstance(peer, InputPeerChat):
+            entry = {"type": "chat", "id": peer.chat_id}
+        else:
+            entry = {"type": "user", "id": peer.user_id, "access_hash": peer.access_hash}
+        entry["title"] = getattr(entity, "title", None) or f"Group {group}"
+        self.entries[group] = entry
+        return peer, entry["title"]
+
+    def save(self):
+        tmp_file = f"{self.path}.tmp"
+        with open(tmp_file, "w") as file:
+            json.dump(self.entries, file)
+        os.replace(tmp_file, self.path)
+
+
+async def run_shard(session_name, shard, shards, detections):
+    client = TelegramClient(session_name, settings.api_id, settings.api_hash)
+    if not os.path.exists(f"{session_name}.session"):
+        logging.error(f"Session file {session_name}.session not found. Run generate_session.py locally to create it.")
+        print(f"Error: Session file {session_name}.session not found. Run generate_session.py locally to create it.")
+        return
+    await client.connect()
+    if not await client.is_user_authorized():
+        logging.error(f"Shard {shard}: session {session_name} is not authorized.")
+        print(f"Error: session {session_name} is not authorized. Regenerate it with generate_session.py.")
+        await client.disconnect()
+        return
+
+    group_list = GroupList(settings.groups_file)
+    entities = EntityCache(f"{session_name}.entities.json")
+    watermarks_file = f"{session_name}.watermarks.json"
+    watermarks = load_watermarks(watermarks_file)  # Advanced by the catch-up poll only
+    live_ids = {}  # group -> ids handled live above its watermark, skipped by the next poll
+    peers = {}  # group -> InputPeer
+    watched = {}  # peer id -> (group, title); what the handler filters on
+    poll_semaphore = asyncio.Semaphore(settings.poll_concurrency)
+    counters = {"messages": 0, "detections": 0, "dropped": 0, "resolve_errors": 0}
+
+    def publish(matches, group_name, is_new, message, marks):
+        counters["detections"] += 1
+        date = message.date.timestamp() if message.date else None
+        try:
+            detections.put_nowait(("detection", matches, group_name, is_new, date, marks))
+        except queue.Full:
+            counters["dropped"] += 1
+            logging.warning(f"Shard {shard}: detection queue full, dropped {matches}")
+
+    async def sync_groups():
+        assigned = [group for group in group_list.groups if shard_for(group, shards) == shard]
+        for group in list(peers):
+            if group not in assigned:
+                watched.pop(get_peer_id(peers.pop(group)), None)
+                print(f"Shard {shard}: stopped monitoring {group}")
+        resolved = False
+        for group in assigned:
+            if group in peers:
+                continue
+            peer, title = entities.get(group)
+            if peer is None:
+                try:
+                    peer, title = entities.put(group, await client.get_entity(group))
+                    resolved = True
+                except Exception as e:
+                    counters["resolve_errors"] += 1
+                    logging.error(f"Shard {shard}: could not resolve {group}: {e}")
+                    continue
+            peers[group] = peer
+            watched[get_peer_id(peer)] = (group, title)
+            print(f"Shard {shard}: monitoring {title} ({group})")
+        if resolved:
+            await asyncio.to_thread(entities.save)
+
+    @client.on(events.NewMessage())
+    async def new_message_handler(event):
+        entry = watched.get(event.chat_id)
+        if entry is None:
+            return
+        received = time.time()
+        group, title = entry
+        counters["messages"] += 1
+        # Not the watermark: a message missed during a disconnect may still sit below this id
+        live_ids.setdefault(group, set()).add(event.message.id)
+        marks = [("received", received)]
+        matches = await scan_message(client, event.message, title, marks=marks)
+        if matches:
+            publish(matches, title, True, event.message, marks)
+
+    async def poll_group(group):
+        async with poll_semaphore:
+            try:
+                min_id = watermarks.get(group, 0)
+                if min_id:
+                    # Oldest first from the watermark, so a backlog longer than one batch is read over several polls
+                    messages = [message async for message in client.iter_messages(
+                        peers[group], limit=settings.poll_batch_limit, min_id=min_id, reverse=True)]
+                else:
+                    messages = [message async for message in client.iter_messages(
+                        peers[group], limit=settings.poll_initial_limit)][::-1]
+                title = watched[get_peer_id(peers[group])][1]
+                handled = live_ids.setdefault(group, set())
+                for message in messages:
+                    if message.id in handled:
+                        continue
+                    matches = await scan_message(client, message, title)
+                    if matches:
+                        publish(matches, title, False, message, None)
+                if messages:
+                    watermarks[group] = max(watermarks.get(group, 0), messages[-1].id)
+                    live_ids[group] = {message_id for message_id in handled if message_id > watermarks[group]}
+            except Exception as e:
+                logging.error(f"Shard {shard}: recent message fetch error in {group}: {e}", exc_info=True)
+
+    async def fetch_recent_messages():
+        while True:
+            before = dict(watermarks)
+            await asyncio.gather(*(poll_group(group) for group in list(peers)))
+            if watermarks != before:
+                await asyncio.to_thread(save_watermarks, dict(watermarks), watermarks_file)
+            await asyncio.sleep(settings.poll_interval)
+
+    async def watch_groups():
+        while True:
+            await asyncio.sleep(settings.groups_reload_interval)
+            if group_list.reload():
+                logging.info(f"Shard {shard}: {settings.groups_file} changed, {len(group_list.groups)} groups")
+                await sync_groups()
+
+    async def push_stats():
+        while True:
+            stats = dict(counters, groups=len(watched), entity_cache_hits=entities.hits,
+                         entity_cache_misses=entities.misses, group_reloads=group_list.reloads,
+                         extractor=contract_extractor.stats())  # Extraction only runs in the shards
+            try:
+                detections.put_nowait(("stats", shard, stats))
+            except queue.Full:
+                pass
+            await asyncio.sleep(settings.metrics_push_interval)
+
+    group_list.reload()
+    await sync_groups()
+    logging.info(f"Shard {shard}/{shards} ({session_name}) watching {len(watched)} groups, "
+                 f"{entities.hits} from the entity cache")
+    tasks = [asyncio.create_task(job()) for job in (fetch_recent_messages, watch_groups, push_stats)]
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: asyncio.ensure_future(client.disconnect()))
+    try:
+        await client.run_until_disconnected()
+    finally:
+        for task in tasks:
+            task.cancel()
+        save_watermarks(dict(watermarks), watermarks_file)
+        await client.disconnect()
+
+
+def shard_main(session_name, shard, shards, detections):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The supervisor decides when shards stop
+    try:
+        asyncio.run(run_shard(session_name, shard, shards, detections))
+    except Exception as e:
+        logging.error(f"Shard {shard} crashed: {e}", exc_info=True)
+        raise
+
+
+def launcher_main(sessions, detections, restart_backoff, stopping, alive, restarts, parent_pid, timeout=10):
+    # Owns the shard processes. It is forked before the consumer starts any thread and never
+    # starts one itself, so every shard, restarts included, forks from a thread-free process
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    context = multiprocessing.get_context("fork")
+    workers = [None] * len(sessions)
+    started_at = [0.0] * len(sessions)
+
+    def start_shard(shard):
+        worker = context.Process(
+            target=shard_main,
+            args=(sessions[shard], shard, len(sessions), detections),
+            name=f"telegram-shard-{shard}",
+            daemon=True
+        )
+        worker.start()
+        workers[shard] = worker
+        started_at[shard] = time.monotonic()
+        logging.info(f"Started shard {shard} ({sessions[shard]}) with PID {worker.pid}")
+        print(f"Started Telegram shard {shard} ({sessions[shard]}) with PID {worker.pid}")
+
+    for shard in range(len(sessions)):
+        start_shard(shard)
+    while not stopping.wait(1.0) and os.getppid() == parent_pid:
+        for shard, worker in enumerate(workers):
+            if worker.is_alive() or time.monotonic() - started_at[shard] < restart_backoff:
+                continue
+            logging.warning(f"Shard {shard} exited with code {worker.exitcode}, restarting")
+            with restarts.get_lock():
+                restarts.value += 1
+            start_shard(shard)
+        alive.value = sum(1 for worker in workers if worker.is_alive())
+
+    for worker in workers:
+        if worker.is_alive():
+            worker.terminate()  # SIGTERM: the shard disconnects and saves its watermarks
+    for worker in workers:
+        worker.join(timeout)
+    alive.value = 0
+
+
+class MonitorSupervisor:
+    """Runs one worker process per session and restarts any that exit.
+
+    `start` forks a launcher process that starts the shards and, at most once
+    per `restart_backoff` seconds each, restarts those that die. Restarts
+    happen there rather than in the consumer, which by then runs the writer,
+    publisher and detection-reader threads that must not be forked. The
+    launcher exits on `stop` or when the consumer goes away. `detections` is
+    the shared multiprocessing queue every shard writes to.
+    """
+
+    def __init__(self, sessions, max_queue=10_000, restart_backoff=30.0):
+        self.sessions = sessions
+        self.context = multiprocessing.get_context("fork")
+        self.detections = self.context.Queue(maxsize=max_queue)
+        self.restart_backoff = restart_backoff
+        self.shard_stats = {}
+        self._stopping = self.context.Event()
+        self._alive = self.context.Value("i", 0)
+        self._restarts = self.context.Value("i", 0)
+        self._launcher = None
+        self._launcher_reported = False
+
+    def start(self):
+        self._launcher = self.context.Process(
+            target=launcher_main,
+            args=(self.sessions, self.detections, self.restart_backoff, self._stopping,
+                  self._alive, self._restarts, os.getpid()),
+            name="telegram-shard-launcher"
+        )
+        self._launcher.start()
+        logging.info(f"Started shard launcher with PID {self._launcher.pid}")
+
+    def check(self):
+        # Shard restarts are the launcher's job; this only reports the launcher itself dying
+        if self._launcher is None or self._launcher.is_alive() or self._stopping.is_set() or self._launcher_reported:
+            return
+        self._launcher_reported = True
+        logging.error(f"Shard launcher exited with code {self._launcher.exitcode}; shards are no longer restarted")
+
+    def stop(self, timeout=10):
+        self._stopping.set()
+        if self._launcher is not None:
+            self._launcher.join(timeout + 5)
+            if self._launcher.is_alive():
+                self._launcher.terminate()
+                self._launcher.join(timeout)
+
+    def stats(self):
+        return {
+            "shards": len(self.sessions),
+            "alive": self._alive.value,
+            "restarts": self._restarts.value,
+            "launcher_alive": self._launcher is not None and self._launcher.is_alive(),
+            "queue_depth": self.detections.qsize(),
+        }
@@ -0,0 +1,168 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from sqlalchemy.exc import IntegrityError
+
+_STOP = object()
+
+
+class PersistenceWriter:
+    """Write-behind stage for Contract and Transaction rows.
+
+    Coroutines call `enqueue` with unsaved model instances, or with callables
+    taking the session for bulk UPDATEs, and return at once. Records are applied
+    in enqueue order. A dedicated thread drains the queue and commits in batches of up to
+    `batch_size` rows or whatever arrived within `flush_interval` seconds, so
+    SQLite fsyncs never run on the event loop.
+
+    `enqueue` never blocks. Once `max_queue` records are waiting, further ones
+    spill into an unbounded overflow deque (counted as `overflowed`) that the
+    writer moves back into the queue as it drains, keeping enqueue order.
+    """
+
+    def __init__(self, app, db, batch_size=100, flush_interval=0.25, max_queue=10_000):
+        self.app = app
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.enqueued = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.overflowed = 0
+        self.overflow = deque()
+        self._overflow_lock = threading.Lock()
+        self.max_depth = 0
+        self.last_batch_seconds = 0.0
+        self.total_batch_seconds = 0.0
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="persistence-writer", daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def _put(self, record):
+        with self._overflow_lock:
+            if not self.overflow:
+                try:
+                    self.queue.put_nowait(record)
+                    return
+                except queue.Full:
+                    logging.warning(f"Persistence queue full ({self.queue.maxsize}), spilling to overflow")
+            # Once anything has spilled, later records queue behind it so order is kept
+            self.overflow.append(record)
+            self.overflowed += 1
+
+    def _refill(self):
+        with self._overflow_lock:
+            while self.overflow:
+                try:
+                    self.queue.put_nowait(self.overflow[0])
+                except queue.Full:
+                    return
+                self.overflow.popleft()
+
+    def enqueue(self, record):
+        self._put(record)
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, self.queue.qsize() + len(self.overflow))
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                record = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if record is _STOP:
+                self.queue.task_done()
+                return batch, True
+            batch.append(record)
+        return batch, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            record = self.queue.get()
+            if record is _STOP:
+                self.queue.task_done()
+                break
+            batch, stopping = self._collect(record)
+            self._refill()  # Before task_done, so flush() cannot return with rows still spilled
+            start = time.perf_counter()
+            with self.app.app_context():
+                self._commit(batch)
+            self.last_batch_seconds = time.perf_counter() - start
+            self.total_batch_seconds += self.last_batch_seconds
+            self.batches += 1
+            for _ in batch:
+                self.queue.task_done()
+
+    def _commit(self, batch):
+        session = self.db.session
+        try:
+            for record in batch:
+                self._apply(session, record)
+            session.commit()
+            self.written += len(batch)
+            return
+        except IntegrityError:
+            session.rollback()
+        except Exception as e:
+            session.rollback()
+            logging.error(f"Batch commit of {len(batch)} rows failed, retrying one by one: {e}")
+
+        # Fall back to per-row commits so one duplicate does not drop the whole batch
+        for record in batch:
+            try:
+                self._apply(session, record)
+                session.commit()
+                self.written += 1
+            except IntegrityError:
+                session.rollback()
+                self.failed += 1
+                logging.info(f"Skipped duplicate {type(record).__name__} row")
+            except Exception as e:
+                session.rollback()
+                self.failed += 1
+                logging.error(f"Failed to persist {type(record).__name__} row: {e}", exc_info=True)
+
+    def _apply(self, session, record):
+        if callable(record):
+            record(session)
+        else:
+            session.add(record)
+
+    def flush(self):
+        self.queue.join()
+
+    def stop(self, timeout=10):
+        if self._thread is None:
+            return
+        self._put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+        logging.info(f"Persistence writer stopped: {self.stats()}")
+
+    def stats(self):
+        return {
+            "depth": self.queue.qsize() + len(self.overflow),
+            "overflow_depth": len(self.overflow),
+            "max_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+            "overflowed": self.overflowed,
+            "last_batch_ms": round(self.last_batch_seconds * 1000, 2),
+            "avg_batch_ms": round(self.total_batch_seconds / self.batches * 1000, 2) if self.batches else 0.0,
+        }
@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import time
+import numpy as np
+from metrics import metrics
+
+MAX_ACCOUNTS_PER_CALL = 100  # getMultipleAccounts limit
+PUMP_FEE = 0.01  # Pump.fun takes 1% of the SOL side of a trade
+
+# Bonding curve account after its 8-byte Anchor discriminator
+CURVE_DTYPE = np.dtype([
+    ("virtual_token_reserves", "<u8"),
+    ("virtual_sol_reserves", "<u8"),
+    ("real_token_reserves", "<u8"),
+    ("real_sol_reserves", "<u8"),
+    ("token_total_supply", "<u8"),
+    ("complete", "u1"),
+])
+CURVE_OFFSET = 8
+TOKEN_AMOUNT_OFFSET = 64  # SPL token account: mint (32), owner (32), amount (u64)
+EMPTY_CURVE = bytes(CURVE_DTYPE.itemsize)
+EMPTY_AMOUNT = bytes(8)
+
+
+class Position:
+    __slots__ = ("token_address", "mint_accounts", "cost_lamports", "cost_dollars", "entry_price", "profit_taken")
+
+    def __init__(self, token_address, mint_accounts, cost_lamports, cost_dollars, entry_price=None, profit_taken=False):
+        self.token_address = token_address
+        self.mint_accounts = mint_accounts
+        self.cost_lamports = cost_lamports
+        self.cost_dollars = cost_dollars
+        self.entry_price = entry_price  # Lamports per token base unit, learned from the first balance seen
+        self.profit_taken = profit_taken
+
+
+class PositionMonitor:
+    """Prices every open position each tick and emits sell orders.
+
+    All bonding curves and user token accounts are read with chunked
+    getMultipleAccounts calls issued concurrently, decoded straight into NumPy
+    arrays, and priced in one vectorized pass. A position at or above
+    `profit_threshold` times its entry price sells enough to take out
+    `sell_profit_factor` times its cost, once; at or below `loss_threshold` it
+    sells everything. Positions whose token balance drops to zero are closed.
+
+    `sell_fn(position, amount, min_sol_output, expected_lamports, reason)` is
+    awaited in its own task; the position is skipped for `sell_cooldown`
+    seconds afterwards so an unconfirmed sell is not repeated.
+    """
+
+    def __init__(self, client, builder, sell_fn, profit_threshold=2.0, sell_profit_factor=1.5, loss_threshold=0.45,
+                 slippage=0.05, tick_interval=0.5, sell_cooldown=15.0, on_entry_price=None):
+        self.client = client
+        self.builder = builder
+        self.sell_fn = sell_fn
+        self.profit_threshold = profit_threshold
+        self.sell_profit_factor = sell_profit_factor
+        self.loss_threshold = loss_threshold
+        self.slippage = slippage
+        self.tick_interval = tick_interval
+        self.sell_cooldown = sell_cooldown
+        self.on_entry_price = on_entry_price
+        self.positions = {}  # token_address -> Position
+        self.cooldown_until = {}
+        self.ticks = 0
+        self.rpc_calls = 0
+        self.tick_errors = 0
+        self.sells = 0
+        self.closed = 0
+        self.last_tick_seconds = 0.0
+        self.max_tick_seconds = 0.0
+        self.portfolio_lamports = 0.0
+        self._keys = None
+        self._task = None
+        self._sells = set()
+
+    def add(self, token_address, cost_lamports, cost_dollars, entry_price=None, profit_taken=False):
+        if token_address in self.positions:
+            return
+        self.positions[token_address] = Position(
+            token_address, self.builder.derive(token_address), cost_lamports, cost_dollars, entry_price, profit_taken
+        )
+        self._keys = None
+
+    def remove(self, token_address):
+        if self.positions.pop(token_address, None) is not None:
+            self.cooldown_until.pop(token_address, None)
+            self._keys = None
+
+    def load(self, session, model):
+        # Open positions are landed buys; balances decide later whether anything is still held.
+        # Buys still "sent" join through their on_confirmed callback once ConfirmationTracker sees them land
+        sold = {address for (address,) in session.query(model.token_address).filter(
+            model.transaction_type == "sell", model.status.in_(("sent", "confirmed", "success"))
+        ).distinct()}
+        rows = session.query(model).filter(
+            model.transaction_type == "buy", model.status.in_(("confirmed", "success"))
+        ).all()
+        for row in rows:
+            self.add(row.token_address, row.amount_in_sol * 1e9, row.amount_in_dollars,
+                     entry_price=row.entry_price, profit_taken=row.token_address in sold)
+        return len(rows)
+
+    async def _fetch(self, keys):
+        chunks = [keys[i:i + MAX_ACCOUNTS_PER_CALL] for i in range(0, len(keys), MAX_ACCOUNTS_PER_CALL)]
+        responses = await asyncio.gather(*(self.client.get_multiple_accounts(chunk) for chunk in chunks))
+        self.rpc_calls += len(chunks)
+        return [account for response in responses for account in response.value]
+
+    async def tick(self):
+        if not self.positions:
+            return 0
+        start = time.perf_counter()
+        self.ticks += 1
+        if self._keys is None:
+            positions = list(self.positions.values())
+            self._keys = (positions, [p.mint_accounts.bonding_curve for p in positions] + [p.mint_accounts.associated_user for p in positions])
+        positions, keys = self._keys
+        count = len(positions)
+        accounts = await self._fetch(keys)
+
+        curves = np.frombuffer(b"".join(
+            bytes(a.data[CURVE_OFFSET:CURVE_OFFSET + CURVE_DTYPE.itemsize]) if a is not None else EMPTY_CURVE
+            for a in accounts[:count]
+        ), dtype=CURVE_DTYPE)
+        balances = np.frombuffer(b"".join(
+            bytes(a.data[TOKEN_AMOUNT_OFFSET:TOKEN_AMOUNT_OFFSET + 8]) if a is not None else EMPTY_AMOUNT
+            for a in accounts[count:]
+        ), dtype="<u8").astype(np.float64)
+        ata_exists = np.fromiter((a is not None for a in accounts[count:]), dtype=bool, count=count)
+
+        virtual_tokens = curves["virtual_token_reserves"].astype(np.float64)
+        virtual_sol = curves["virtual_sol_reserves"].astype(np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            price = np.where(virtual_tokens > 0, virtual_sol / virtual_tokens, np.nan)
+
+            entry = np.fromiter((p.entry_price if p.entry_price is not None else np.nan for p in positions), dtype=np.float64, count=count)
+            cost = np.fromiter((p.cost_lamports for p in positions), dtype=np.float64, count=count)
+            learn = np.isnan(entry) & (balances > 0)
+            entry[learn] = cost[learn] / balances[learn]
+            ratio = price / entry
+
+        profit_taken = np.fromiter((p.profit_taken for p in positions), dtype=bool, count=count)
+        now = time.monotonic()
+        cooling = np.fromiter((self.cooldown_until.get(p.token_address, 0.0) > now for p in positions), dtype=bool, count=count)
+        tradable = (balances > 0) & (virtual_tokens > 0) & (curves["complete"] == 0) & ~cooling & ~np.isnan(ratio)
+
+        take_profit = tradable & ~profit_taken & (ratio >= self.profit_threshold)
+        stop_loss = tradable & (ratio <= self.loss_threshold)
+        fraction = np.zeros(count)
+        fraction[take_profit] = np.minimum(1.0, self.sell_profit_factor / ratio[take_profit])
+        fraction[stop_loss] = 1.0
+        amount = np.floor(balances * fraction)
+        # Constant-product output for selling `amount` into the curve, after the fee
+        with np.errstate(divide="ignore", invalid="ignore"):
+            expected = np.where(amount > 0, amount * virtual_sol / (virtual_tokens + amount) * (1 - PUMP_FEE), 0.0)
+        min_sol_output = np.floor(expected * (1 - self.slippage))
+        self.portfolio_lamports = float(np.nansum(balances * price))
+
+        for i in np.flatnonzero(learn):
+            positions[i].entry_price = float(entry[i])
+            if self.on_entry_price is not None:
+                self.on_entry_price(positions[i].token_address, positions[i].entry_price)
+        for i in np.flatnonzero(amount > 0):
+            position = positions[i]
+            reason = "stop_loss" if stop_loss[i] else "take_profit"
+            if reason == "take_profit":
+                position.profit_taken = True
+            self.cooldown_until[position.token_address] = now + self.sell_cooldown
+            self.sells += 1
+            logging.info(f"Selling {int(amount[i])} of {position.token_address} ({reason}, {ratio[i]:.2f}x entry)")
+            task = asyncio.create_task(self._sell(position, int(amount[i]), int(min_sol_output[i]), float(expected[i]), reason))
+            self._sells.add(task)
+            task.add_done_callback(self._sells.discard)
+        for i in np.flatnonzero(ata_exists & (balances == 0) & ~np.isnan(entry) & ~cooling):
+            self.closed += 1
+            logging.info(f"Position in {positions[i].token_address} closed")
+            self.remove(positions[i].token_address)
+
+        self.last_tick_seconds = time.perf_counter() - start
+        self.max_tick_seconds = max(self.max_tick_seconds, self.last_tick_seconds)
+        metrics.observe("xcute_position_tick_seconds", self.last_tick_seconds, "Time to fetch and price every open position")
+        return int(np.count_nonzero(amount > 0))
+
+    async def _sell(self, position, amount, min_sol_output, expected_lamports, reason):
+        try:
+            await self.sell_fn(position, amount, min_sol_output, expected_lamports, reason)
+        except Exception as e:
+            logging.error(f"Sell of {position.token_address} failed: {e}")
+
+    async def run(self):
+        while True:
+            try:
+                await self.tick()
+            except Exception as e:
+                self.tick_errors += 1
+                logging.warning(f"Position tick failed: {e}", exc_info=True)
+            await asyncio.sleep(self.tick_interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        return {
+            "positions": len(self.positions),
+            "ticks": self.ticks,
+            "rpc_calls": self.rpc_calls,
+            "tick_errors": self.tick_errors,
+            "sells": self.sells,
+            "closed": self.closed,
+            "portfolio_sol": round(self.portfolio_lamports / 1e9, 6),
+            "last_tick_ms": round(self.last_tick_seconds * 1000, 2),
+            "max_tick_ms": round(self.max_tick_seconds * 1000, 2),
+        }
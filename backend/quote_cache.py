@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import struct
+import time
+from collections import OrderedDict, deque
+from position_monitor import CURVE_OFFSET, PUMP_FEE
+
+# A fresh pump.fun curve; the price only rises from here, so it bounds tokens out from above
+INITIAL_VIRTUAL_TOKEN_RESERVES = 1_073_000_000_000_000
+INITIAL_VIRTUAL_SOL_RESERVES = 30_000_000_000
+RESERVES = struct.Struct("<QQ")  # virtual token reserves, virtual SOL reserves
+
+MAX_COMPUTE_UNITS = 1_400_000
+# Used until simulateTransaction samples arrive; a pump.fun buy consumes well under these
+DEFAULT_UNITS = {"buy": 100_000, "buy_ata": 130_000, "sell": 100_000}
+
+
+class QuoteCache:
+    """Local quotes and compute budgets for buys, with no RPC call on the hot path.
+
+    Bonding-curve reserves are prefetched in the background as soon as a mint
+    is detected. `quote` uses them when younger than `max_age` seconds and
+    otherwise falls back to the last known (or initial) reserves with the wider
+    `unknown_slippage`, which is how a mint whose prefetch has not come back
+    yet is quoted. Setting `wait_timeout` opts into `wait`, which holds a buy
+    for up to that many seconds on a prefetch already in flight; that trades
+    an RPC round trip on the hot path for a tighter quote.
+
+    Compute units are learned per instruction shape ("buy", "buy_ata", "sell")
+    from simulateTransaction samples taken at most every `sample_interval`
+    seconds per shape. The limit is the largest recent sample plus `margin`.
+    The CU price is a fixed `cu_price` (micro-lamports per unit), so the
+    priority fee falls as the learned limit tightens. Setting
+    `priority_fee_lamports` instead spreads that fixed total over the limit,
+    bidding more per unit for the same fee. A batch transaction gets the sum
+    of its shapes' limits (and, in that mode, one fee per shape).
+    """
+
+    def __init__(self, client, cache_size=4096, max_age=2.0, slippage=0.05, unknown_slippage=0.25,
+                 cu_price=100_000, priority_fee_lamports=0, margin=0.15, sample_interval=60.0, samples=20, wait_timeout=0.0):
+        self.client = client
+        self.cache_size = cache_size
+        self.max_age = max_age
+        self.slippage = slippage
+        self.unknown_slippage = unknown_slippage
+        self.cu_price = cu_price
+        self.priority_fee_lamports = priority_fee_lamports
+        self.margin = margin
+        self.sample_interval = sample_interval
+        self.wait_timeout = wait_timeout
+        self.reserves = OrderedDict()  # mint str -> (virtual tokens, virtual SOL, monotonic fetch time)
+        self.units = {shape: deque(maxlen=samples) for shape in DEFAULT_UNITS}
+        self.last_sample = {}
+        self.fresh_quotes = 0
+        self.fallback_quotes = 0
+        self.prefetches = 0
+        self.prefetch_errors = 0
+        self.prefetch_waits = 0
+        self.prefetch_wait_timeouts = 0
+        self.simulations = 0
+        self.simulation_errors = 0
+        self._tasks = set()
+        self._prefetching = {}  # mint str -> task fetching its reserves
+
+    def update(self, mint, virtual_tokens, virtual_sol):
+        self.reserves[mint] = (virtual_tokens, virtual_sol, time.monotonic())
+        self.reserves.move_to_end(mint)
+        if len(self.reserves) > self.cache_size:
+            self.reserves.popitem(last=False)
+
+    def _spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def prefetch(self, mint_accounts):
+        mint = str(mint_accounts.mint)
+        task = self._prefetching.get(mint)
+        if task is None:
+            task = self._prefetching[mint] = self._spawn(self._fetch_reserves(mint_accounts))
+            task.add_done_callback(lambda _: self._prefetching.pop(mint, None))
+        return task
+
+    async def wait(self, mints):
+        # Waits, at most wait_timeout seconds, for prefetches already running for `mints`
+        if self.wait_timeout <= 0:
+            return
+        tasks = [self._prefetching[mint] for mint in mints if mint in self._prefetching]
+        if not tasks:
+            return
+        self.prefetch_waits += 1
+        _, pending = await asyncio.wait(tasks, timeout=self.wait_timeout)
+        if pending:
+            self.prefetch_wait_timeouts += 1
+
+    async def _fetch_reserves(self, mint_accounts):
+        self.prefetches += 1
+        try:
+            account = (await self.client.get_account_info(mint_accounts.bonding_curve)).value
+        except Exception as e:
+            self.prefetch_errors += 1
+            logging.warning(f"Bonding curve prefetch failed for {mint_accounts.mint}: {e}")
+            return
+        if account is not None:
+            self.update(str(mint_accounts.mint), *RESERVES.unpack_from(bytes(account.data), CURVE_OFFSET))
+
+    def quote(self, mint, lamports_in):
+        # Returns (tokens expected for lamports_in, slippage to apply)
+        cached = self.reserves.get(mint)
+        if cached is not None and time.monotonic() - cached[2] <= self.max_age:
+            self.fresh_quotes += 1
+            virtual_tokens, virtual_sol, _ = cached
+            slippage = self.slippage
+        else:
+            self.fallback_quotes += 1
+            virtual_tokens, virtual_sol = cached[:2] if cached is not None else (INITIAL_VIRTUAL_TOKEN_RESERVES, INITIAL_VIRTUAL_SOL_RESERVES)
+            slippage = self.unknown_slippage
+        sol_after_fee = int(lamports_in * (1 - PUMP_FEE))
+        tokens = virtual_tokens - (virtual_tokens * virtual_sol) // (virtual_sol + sol_after_fee)
+        return tokens, slippage
+
+    def compute_units(self, shape):
+        samples = self.units[shape]
+        if not samples:
+            return DEFAULT_UNITS[shape]
+        return min(int(max(samples) * (1 + self.margin)), MAX_COMPUTE_UNITS)
+
+    def compute_budget(self, *shapes):
+        # (unit limit, micro-lamports per unit) for a transaction holding one instruction group per shape
+        limit = min(sum(self.compute_units(shape) for shape in shapes), MAX_COMPUTE_UNITS)
+        if self.priority_fee_lamports:
+            return limit, self.priority_fee_lamports * len(shapes) * 1_000_000 // limit
+        return limit, self.cu_price
+
+    def should_sample(self, shape):
+        now = time.monotonic()
+        if now - self.last_sample.get(shape, float("-inf")) < self.sample_interval:
+            return False
+        self.last_sample[shape] = now
+        return True
+
+    def sample(self, shape, transaction):
+        # `transaction` must carry a generous CU limit so the simulation is not cut short
+        return self._spawn(self._simulate(shape, transaction))
+
+    async def _simulate(self, shape, transaction):
+        self.simulations += 1
+        try:
+            result = (await self.client.simulate_transaction(transaction)).value
+        except Exception as e:
+            self.simulation_errors += 1
+            logging.warning(f"Compute unit simulation failed for {shape}: {e}")
+            return
+        if result.err is not None or not result.units_consumed:
+            self.simulation_errors += 1
+            logging.info(f"Discarded {shape} compute unit sample: {result.err}")
+            return
+        self.units[shape].append(result.units_consumed)
+        logging.info(f"{shape} consumed {result.units_consumed} CU, limit now {self.compute_units(shape)}")
+
+    def stats(self):
+        stats = {
+            "cached_curves": len(self.reserves),
+            "fresh_quotes": self.fresh_quotes,
+            "fallback_quotes": self.fallback_quotes,
+            "prefetches": self.prefetches,
+            "prefetch_errors": self.prefetch_errors,
+            "prefetch_waits": self.prefetch_waits,
+            "prefetch_wait_timeouts": self.prefetch_wait_timeouts,
+            "simulations": self.simulations,
+            "simulation_errors": self.simulation_errors,
+        }
+        for shape in DEFAULT_UNITS:
+            stats[f"{shape}_cu_limit"] = self.compute_units(shape)
+        return stats
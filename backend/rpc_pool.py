@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import time
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.api import Client
+
+
+class RpcEndpoint:
+    def __init__(self, url, timeout=10, latency_alpha=0.2, max_failures=3, cooldown=30.0):
+        self.url = url
+        self.client = AsyncClient(url, timeout=timeout)  # httpx keeps the connection alive between calls
+        self.timeout = timeout
+        self.latency_alpha = latency_alpha
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.latency = None  # EWMA in seconds
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.last_failure = 0.0
+        self._sync_client = None
+
+    @property
+    def sync_client(self):
+        # Flask views run outside the monitor's event loop, so they get their own keep-alive client
+        if self._sync_client is None:
+            self._sync_client = Client(self.url, timeout=self.timeout)
+        return self._sync_client
+
+    def healthy(self):
+        if self.consecutive_failures < self.max_failures:
+            return True
+        return time.monotonic() - self.last_failure > self.cooldown
+
+    def record_success(self, elapsed):
+        self.requests += 1
+        self.consecutive_failures = 0
+        if self.latency is None:
+            self.latency = elapsed
+        else:
+            self.latency += self.latency_alpha * (elapsed - self.latency)
+
+    def record_failure(self):
+        self.requests += 1
+        self.errors += 1
+        self.consecutive_failures += 1
+        self.last_failure = time.monotonic()
+
+    def stats(self):
+        return {
+            "url": self.url,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "requests": self.requests,
+            "errors": self.errors,
+            "healthy": self.healthy(),
+        }
+
+
+class RpcPool:
+    """Set of RPC endpoints used in place of a single AsyncClient.
+
+    Reads (`get_*`, `simulate_*`) go to the fastest healthy endpoint and fail
+    over to the next one. `send_transaction` fans the serialized transaction
+    out to `send_fanout` endpoints and returns the first acknowledged result.
+    """
+
+    def __init__(self, urls, send_fanout=0, timeout=10):
+        if not urls:
+            raise ValueError("RpcPool needs at least one endpoint")
+        self.endpoints = [RpcEndpoint(url, timeout=timeout) for url in urls]
+        self.send_fanout = send_fanout or len(self.endpoints)
+        self._background = set()
+
+    def ranked(self):
+        # Unmeasured endpoints sort first so every endpoint gets sampled
+        healthy = [e for e in self.endpoints if e.healthy()] or list(self.endpoints)
+        return sorted(healthy, key=lambda e: -1 if e.latency is None else e.latency)
+
+    def fastest(self):
+        return self.ranked()[0]
+
+    async def _call(self, endpoint, method, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = await getattr(endpoint.client, method)(*args, **kwargs)
+        except Exception:
+            endpoint.record_failure()
+            raise
+        endpoint.record_success(time.perf_counter() - start)
+        return result
+
+    async def read(self, method, *args, **kwargs):
+        last_error = None
+        for endpoint in self.ranked():
+            try:
+                return await self._call(endpoint, method, *args, **kwargs)
+            except Exception as e:
+                last_error = e
+                logging.warning(f"RPC {method} failed on {endpoint.url}: {e}")
+        raise last_error
+
+    def sync_read(self, method, *args, **kwargs):
+        last_error = None
+        for endpoint in self.ranked():
+            start = time.perf_counter()
+            try:
+                result = getattr(endpoint.sync_client, method)(*args, **kwargs)
+            except Exception as e:
+                endpoint.record_failure()
+                last_error = e
+                logging.warning(f"RPC {method} failed on {endpoint.url}: {e}")
+                continue
+            endpoint.record_success(time.perf_counter() - start)
+            return result
+        raise last_error
+
+    def __getattr__(self, name):
+        if name.startswith(("get_", "simulate_")):
+            async def reader(*args, **kwargs):
+                return await self.read(name, *args, **kwargs)
+            return reader
+        raise AttributeError(name)
+
+    async def send_transaction(self, txn, opts=None):
+        return await self.send_raw_transaction(bytes(txn), opts=opts)
+
+    async def send_raw_transaction(self, txn, opts=None):
+        targets = self.ranked()[:self.send_fanout]
+        pending = {asyncio.ensure_future(self._call(e, "send_raw_transaction", txn, opts=opts)): e for e in targets}
+        last_error = None
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                endpoint = pending.pop(task)
+                try:
+                    result = task.result()
+                except Exception as e:
+                    last_error = e
+                    logging.warning(f"sendTransaction failed on {endpoint.url}: {e}")
+                    continue
+                # Let the slower sends finish in the background; they only help propagation
+                for straggler in pending:
+                    self._background.add(straggler)
+                    straggler.add_done_callback(self._settle)
+                return result
+        raise last_error
+
+    def _settle(self, task):
+        self._background.discard(task)
+        if not task.cancelled():
+            task.exception()  # Already recorded on the endpoint; mark as retrieved
+
+    async def close(self):
+        for endpoint in self.endpoints:
+            await endpoint.client.close()
+
+    def stats(self):
+        return [e.stats() for e in self.endpoints]
@@ -1,16 +1,23 @@
-import re
+import json
 import logging
-from telethon import TelegramClient, events
-from datetime import datetime
+import threading
+from datetime import datetime, timezone
 from config import settings
-from buy_program import buy_token
+from buy_program import buy_token, buy_tokens, lookup_tables, position_monitor, prefetch_quote, quote_cache, restored_confirmation
+from contract_index import SeenAddressIndex
+from contract_extractor import ContractExtractor
+from buy_pipeline import BuyPipeline
+from metrics import LatencyTrace, metrics
 import asyncio
 import os
+import signal
+import time
 import traceback
 
-def load_groups():
+def load_groups(path=None):
+    path = path or settings.groups_file
     try:
-        with open(settings.groups_file, "r") as file:
+        with open(path, "r") as file:
             groups = [line.strip() for line in file.readlines() if line.strip()]
         if not groups:
             logging.warning("No groups found in groups.txt")
@@ -18,180 +25,285 @@ def load_groups():
         print(f"Loaded groups: {groups}")
         return groups
     except FileNotFoundError:
-        logging.error(f"Error: {settings.groups_file} not found!")
-        print(f"Error: {settings.groups_file} not found!")
+        logging.error(f"Error: {path} not found!")
+        print(f"Error: {path} not found!")
         return []
     except Exception as e:
         logging.error(f"Error loading groups: {e}")
         print(f"Error loading groups: {e}")
         return []
 
-group_links = load_groups()
+def load_watermarks(path=None):
+    try:
+        with open(path or settings.watermarks_file, "r") as file:
+            return {group: int(message_id) for group, message_id in json.load(file).items()}
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logging.error(f"Error loading watermarks: {e}")
+        return {}
 
-async def process_contract(client, message, group_name, is_new=True):
-    from main import socketio, db, app, Contract
-    
+def save_watermarks(watermarks, path=None):
+    path = path or settings.watermarks_file
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, "w") as file:
+        json.dump(watermarks, file)
+    os.replace(tmp_file, path)
+
+seen_contracts = SeenAddressIndex(settings.seen_contracts_size)
+contract_extractor = ContractExtractor(min_length=settings.address_min_length, pump_only=settings.pump_only)
+buy_pipeline = BuyPipeline(buy_token, concurrency=settings.buy_concurrency, rate_limit=settings.buy_rate_limit,
+                           batch_fn=buy_tokens, batch_size=settings.buy_batch_size)
+
+async def extract_message_text(client, message):
     message_text = message.raw_text or message.text or message.message or ""
-    timestamp = message.date
-    if not message_text and message.media:
-        if hasattr(message.media, 'webpage') and message.media.webpage:
-            message_text = message.media.webpage.url or ""
-            print(f"Extracted webpage URL: {message_text}")
-        elif hasattr(message.media, 'document') and message.media.document:
-            message_text = message.message or ""
-            print(f"Media caption: {message_text}")
-        elif str(message.media) == 'MessageMediaUnsupported()':
-            message_text = message.raw_text or ""
-            if message.entities:
-                for entity in message.entities:
-                    if entity.__class__.__name__ == 'MessageEntityTextUrl':
-                        message_text = message.get_entity(entity).url or message_text
-                        print(f"Extracted URL from entity: {message_text}")
-            if not message_text and message.fwd_from:
-                try:
-                    forwarded = await client.get_messages(message.chat_id, ids=message.fwd_from.message_id)
-                    message_text = forwarded.raw_text or forwarded.text or ""
-                except Exception as e:
-                    logging.error(f"Failed to fetch forwarded message: {e}")
-            print(f"Fallback using raw_text, entities, or forwarded: '{message_text}', full media: {message.media}")
-            logging.info(f"Fallback raw_text: {message_text}, full media: {message.media}")
+    if message_text or not message.media:
+        return message_text
+
+    # Fallback chain for media-only messages; the forwarded-message fetch is a network call, so it goes last
+    if hasattr(message.media, 'webpage') and message.media.webpage:
+        message_text = message.media.webpage.url or ""
+        print(f"Extracted webpage URL: {message_text}")
+    elif hasattr(message.media, 'document') and message.media.document:
+        message_text = message.message or ""
+        print(f"Media caption: {message_text}")
+    elif message.media.__class__.__name__ == 'MessageMediaUnsupported':
+        message_text = message.raw_text or ""
+        if message.entities:
+            for entity in message.entities:
+                if entity.__class__.__name__ == 'MessageEntityTextUrl':
+                    message_text = message.get_entity(entity).url or message_text
+                    print(f"Extracted URL from entity: {message_text}")
+        if not message_text and message.fwd_from:
+            try:
+                forwarded = await client.get_messages(message.chat_id, ids=message.fwd_from.message_id)
+                message_text = forwarded.raw_text or forwarded.text or ""
+            except Exception as e:
+                logging.error(f"Failed to fetch forwarded message: {e}")
+        print(f"Fallback using raw_text, entities, or forwarded: '{message_text}', full media: {message.media}")
+        logging.info(f"Fallback raw_text: {message_text}, full media: {message.media}")
+    return message_text
 
+async def scan_message(client, message, group_name, marks=None):
+    # Text extraction and address matching; runs in the Telegram shard processes.
+    # `marks` collects wall-clock stage times so the consumer can continue the trace.
+    message_text = await extract_message_text(client, message)
     if not message_text:
         print(f"Empty message from {group_name}")
-        return
+        return []
+    if marks is not None:
+        marks.append(("text_extracted", time.time()))
 
-    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    matches = re.findall(PUMP_FUN_ADDRESS_PATTERN, message_text)
-    print(f"Regex matches for '{message_text}': {matches}")
+    matches = contract_extractor.extract(message_text)
+    if marks is not None:
+        marks.append(("regex_matched", time.time()))
+    print(f"Contract matches for '{message_text}': {matches}")
     if not matches:
         logging.info(f"No Pump.fun contract detected in {group_name}.")
         print(f"No contracts found in {group_name} message: '{message_text}'")
-        return
+    return matches
+
+async def process_contract(client, message, group_name, is_new=True, received_at=None):
+    # Single-process path: scan and handle in one go. received_at is a perf_counter reading
+    marks = [("received", time.time() - (time.perf_counter() - received_at))] if is_new and received_at is not None else None
+    matches = await scan_message(client, message, group_name, marks=marks)
+    if matches:
+        trace = LatencyTrace.from_wall(message.date, marks) if marks is not None else None
+        await handle_matches(matches, group_name, is_new=is_new, trace=trace, detected_at=received_at)
 
+def lookup_contract_id(contract_address):
+    # Index miss: an indexed point lookup covers rows evicted from the index. Runs in a worker
+    # thread so a reader waiting out the writer's SQLite lock never stalls the event loop
+    from main import db, app, Contract
+    with app.app_context():
+        return db.session.query(Contract.id).filter_by(address=contract_address).scalar()
+
+async def handle_matches(matches, group_name, is_new=True, trace=None, detected_at=None):
+    from main import event_publisher, Contract, persistence
+
+    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     for match in matches:
         contract_address = match
         log_message = f"Detected Pump.fun contract in {group_name}: {contract_address}"
         logging.info(log_message)
         print(f"Found contract: {contract_address} in {group_name} at {current_time}")
 
+        contract_trace = trace.fork() if trace is not None else None
+        if seen_contracts.seen(contract_address):
+            print(f"Contract {contract_address} already seen, skipping")
+            continue
+
+        # Claimed before the lookup awaits, so a concurrent detection of the same address is a hit
+        seen_contracts.add(contract_address)
+        looked_up = False
         try:
-            with app.app_context():
-                existing = db.session.query(Contract).filter_by(address=contract_address).first()
-                if not existing:
-                    new_contract = Contract(
-                        address=contract_address,
-                        group=group_name,
-                        status="found",
-                        timestamp=datetime.now()
-                    )
-                    db.session.add(new_contract)
-                    db.session.commit()
-                    contract_id = new_contract.id
-                    print(f"Added contract {contract_address} to database with ID {contract_id}, status: found")
-                else:
-                    contract_id = existing.id
-                    print(f"Contract {contract_address} already in database with ID {contract_id}")
-
-                socketio.emit("contract", {
-                    "contract": contract_address,
-                    "group": group_name,
-                    "timestamp": current_time
-                })
-                print(f"Emitted contract event: {contract_address}")
-                logging.info(f"Emitted contract event: {contract_address}")
-
-                if is_new and not existing:  # Only buy new contracts on first detection
-                    print(f"Attempting to buy token: {contract_address}")
-                    await buy_token(contract_address, group_name)
-                    print(f"Buy transaction completed for {contract_address}")
+            contract_id = await asyncio.to_thread(lookup_contract_id, contract_address)
+            looked_up = True
+            existing = contract_id is not None
+            if not existing:
+                persistence.enqueue(Contract(
+                    address=contract_address,
+                    group=group_name,
+                    status="found",
+                    timestamp=datetime.now()
+                ))
+                print(f"Queued contract {contract_address} for database, status: found")
+            else:
+                seen_contracts.add(contract_address, contract_id)
+                print(f"Contract {contract_address} already in database with ID {contract_id}")
+            if contract_trace is not None:
+                contract_trace.mark("dedup_checked")
+
+            event_publisher.emit("contract", {
+                "contract": contract_address,
+                "group": group_name,
+                "timestamp": current_time
+            })
+            print(f"Emitted contract event: {contract_address}")
+            logging.info(f"Emitted contract event: {contract_address}")
+
+            if is_new and not existing:  # Only buy new contracts on first detection
+                prefetch_quote(contract_address)
+                if buy_pipeline.submit(contract_address, group_name, detected_at=detected_at, trace=contract_trace):
+                    print(f"Queued buy for token: {contract_address}")
+                    contract_trace = None  # Finished by buy_token once the transaction is sent
 
         except Exception as e:
-            with app.app_context():
-                db.session.rollback()
+            if not looked_up:  # Unknown whether it is new, so let a later detection retry
+                seen_contracts.discard(contract_address)
             logging.error(f"Error processing contract {contract_address} in {group_name}: {e}", exc_info=True)
             print(f"Failed to process {contract_address}: {e}")
 
-        await asyncio.sleep(1)
+        if contract_trace is not None:
+            contract_trace.finish()
 
-async def start_monitoring(session_name="telegram_monitor_session"):
-    from main import socketio, db, app, Contract
+def extractor_stats(supervisor):
+    # Summed over the shards' extractors; the consumer never extracts anything itself
+    totals = {}
+    for stats in supervisor.shard_stats.values():
+        for key, value in stats.get("extractor", {}).items():
+            totals[key] = totals.get(key, 0) + value
+    return totals
 
-    client = TelegramClient(session_name, settings.api_id, settings.api_hash)
-    if not group_links:
-        logging.error("No groups to monitor. Exiting.")
-        print("No groups to monitor. Exiting.")
-        return
+async def push_metrics(supervisor, event_publisher, persistence, blockhash_service, confirmation_tracker):
+    while True:
+        await asyncio.sleep(settings.metrics_push_interval)
+        metrics.set_gauges("xcute_buy_pipeline", buy_pipeline.stats())
+        metrics.set_gauges("xcute_confirmations", confirmation_tracker.stats())
+        metrics.set_gauges("xcute_positions", position_monitor.stats())
+        metrics.set_gauges("xcute_quotes", quote_cache.stats())
+        metrics.set_gauges("xcute_lookup_tables", lookup_tables.stats())
+        metrics.set_gauges("xcute_persistence", persistence.stats())
+        metrics.set_gauges("xcute_blockhash", blockhash_service.stats())
+        metrics.set_gauges("xcute_extractor", extractor_stats(supervisor))
+        metrics.set_gauges("xcute_seen_contracts", seen_contracts.stats())
+        metrics.set_gauges("xcute_event_publisher", event_publisher.stats())
+        metrics.set_gauges("xcute_supervisor", supervisor.stats())
+        for shard, stats in supervisor.shard_stats.items():
+            metrics.set_gauges("xcute_shard", stats, shard=shard)
+            metrics.set_gauges("xcute_extractor", stats.get("extractor", {}), shard=shard)
+        event_publisher.emit("__metrics__", metrics.snapshot())
 
-    session_file = f"{session_name}.session"
-    if not os.path.exists(session_file):
-        logging.error(f"Session file {session_file} not found. Run generate_session.py locally to create it.")
-        print(f"Error: Session file {session_file} not found. Run generate_session.py locally to create it.")
-        return
+async def start_monitoring(sessions=None):
+    """Consumer side of the monitor.
 
-    try:
-        await client.connect()
-        if not await client.is_user_authorized():
-            logging.error("Client not authorized. Ensure the session file is valid and matches TELEGRAM_PHONE.")
-            print("Error: Client not authorized. Regenerate the session file with generate_session.py.")
-            await client.disconnect()
+    Starts one Telegram shard process per session (see monitor_supervisor),
+    then dedups, persists and buys every detection they put on the shared
+    queue. Runs until SIGTERM.
+    """
+    from main import event_publisher, db, app, Contract, Transaction, blockhash_service, token_accounts, persistence, confirmation_tracker
+    from monitor_supervisor import MonitorSupervisor
+
+    sessions = sessions or settings.monitor_sessions
+    supervisor = MonitorSupervisor(sessions, max_queue=settings.detection_queue_size)
+    supervisor.start()  # Forked before this process starts any threads of its own
+    loop = asyncio.get_running_loop()
+    stopped = asyncio.Event()
+    loop.add_signal_handler(signal.SIGTERM, stopped.set)
+
+    def handle_detection(item):
+        kind = item[0]
+        if kind == "stats":
+            supervisor.shard_stats[item[1]] = item[2]
             return
+        _, matches, group_name, is_new, message_date, marks = item
+        trace = None
+        if marks is not None:
+            date = datetime.fromtimestamp(message_date, timezone.utc) if message_date is not None else None
+            trace = LatencyTrace.from_wall(date, marks)
+            trace.mark("handed_off")
+        detected_at = trace.marks[0][1] if trace is not None else None
+        asyncio.create_task(handle_matches(matches, group_name, is_new=is_new, trace=trace, detected_at=detected_at))
 
-        logging.info("Telegram client connected successfully.")
-        print("Telegram client started and connected.")
-        async for dialog in client.iter_dialogs():
-            chat_id = dialog.entity.id
-            if str(chat_id) in [str(chat.id) if hasattr(chat, 'id') else chat.split('/')[-1] for chat in group_links]:
-                print(f"Monitoring chat: {dialog.title} (ID: {chat_id})")
-
-        @client.on(events.NewMessage(chats=group_links))
-        async def new_message_handler(event):
-            group_name = event.chat.title or f"Group {event.chat_id}"
-            print(f"New message received from {event.chat_id} at {event.message.date}: '{event.message.raw_text or event.message.text}'")
-            await process_contract(client, event.message, group_name, is_new=True)
-
-        async def keep_alive(client):
-            while True:
-                try:
-                    dialogs = await client.get_dialogs(limit=1)
-                    logging.info("Keep-alive: Fetched dialogs to maintain Render activity.")
-                    print("Keep-alive: Fetched dialogs.")
-                except Exception as e:
-                    logging.error(f"Keep-alive error: {e}", exc_info=True)
-                    print(f"Keep-alive error: {e}")
-                await asyncio.sleep(300)
-
-        async def keepalive():
-            while True:
-                print("Telegram client still alive...")
-                await asyncio.sleep(10)
-
-        async def fetch_recent_messages(client):
-            while True:
-                print("Fetching recent messages...")
-                logging.info("Starting recent message fetch cycle")
-                try:
-                    for group in group_links:
-                        async for message in client.iter_messages(group, limit=5):
-                            group_name = (await client.get_entity(group)).title or f"Group {group}"
-                            await process_contract(client, message, group_name, is_new=False)
-                except Exception as e:
-                    logging.error(f"Recent message fetch error: {e}", exc_info=True)
-                    print(f"Recent message fetch error: {e}")
-                await asyncio.sleep(60)
-
-        asyncio.create_task(keep_alive(client))
-        asyncio.create_task(keepalive())
-        asyncio.create_task(fetch_recent_messages(client))
-        logging.info("Starting Telegram client event loop.")
-        await client.run_until_disconnected()
+    def read_detections():
+        # multiprocessing.Queue.get blocks, so a thread hands items over to the loop
+        while True:
+            item = supervisor.detections.get()
+            if item is None:
+                return
+            loop.call_soon_threadsafe(handle_detection, item)
+
+    async def keep_alive():
+        while True:
+            await asyncio.sleep(300)
+            logging.info(f"Supervisor: {supervisor.stats()} shards: {supervisor.shard_stats}")
+            logging.info(f"Blockhash cache: {blockhash_service.stats()}")
+            logging.info(f"Persistence writer: {persistence.stats()}")
+            logging.info(f"Buy pipeline: {buy_pipeline.stats()}")
+            logging.info(f"Confirmations: {confirmation_tracker.stats()}")
+            logging.info(f"Positions: {position_monitor.stats()}")
+            logging.info(f"Quotes: {quote_cache.stats()}")
+            logging.info(f"Lookup tables: {lookup_tables.stats()}")
+            logging.info(f"Contract extractor: {extractor_stats(supervisor)}")
+            logging.info(f"Event publisher: {event_publisher.stats()}")
+
+    async def watch_shards():
+        while True:
+            await asyncio.sleep(5)
+            supervisor.check()
+
+    tasks = []
+    try:
+        persistence.start()
+        blockhash_service.start()
+        confirmation_tracker.start()
+        await lookup_tables.load()
+        if lookup_tables.accounts:
+            logging.info(f"Compiling buys against {lookup_tables.stats()['tables']} lookup table(s)")
+        buy_pipeline.start()
+        await token_accounts.seed()
+        with app.app_context():
+            loaded = seen_contracts.warm_load(db.session, Contract)
+            restored, expired = confirmation_tracker.restore(db.session, Transaction, on_confirmed=restored_confirmation)
+            positions = position_monitor.load(db.session, Transaction) if settings.position_monitor_enabled else 0
+        logging.info(f"Loaded {loaded} known contracts into the dedup index")
+        logging.info(f"Re-tracking {restored} unconfirmed signatures, marked {expired} stale ones expired")
+        if settings.position_monitor_enabled:
+            logging.info(f"Loaded {positions} open positions")
+            position_monitor.start()
+
+        threading.Thread(target=read_detections, name="detection-reader", daemon=True).start()
+        tasks = [
+            asyncio.create_task(keep_alive()),
+            asyncio.create_task(watch_shards()),
+            asyncio.create_task(push_metrics(supervisor, event_publisher, persistence, blockhash_service, confirmation_tracker)),
+        ]
+        logging.info(f"Monitoring with {len(sessions)} Telegram shard(s).")
+        print(f"Monitoring with {len(sessions)} Telegram shard(s).")
+        await stopped.wait()
     except Exception as e:
-        logging.error(f"Critical error in Telegram client: {e}\n{traceback.format_exc()}")
-        print(f"Critical error in Telegram client: {e}")
+        logging.error(f"Critical error in Telegram monitor: {e}\n{traceback.format_exc()}")
+        print(f"Critical error in Telegram monitor: {e}")
     finally:
-        logging.info("Disconnecting Telegram client.")
-        await client.disconnect()
-
-PUMP_FUN_ADDRESS_PATTERN = r"\b[1-9A-HJ-NP-Za-km-z]{44}\b"
+        logging.info("Stopping Telegram shards.")
+        for task in tasks:
+            task.cancel()
+        supervisor.stop()
+        supervisor.detections.put(None)
+        await buy_pipeline.stop()
+        await position_monitor.stop()
+        await confirmation_tracker.stop()
+        persistence.stop()
 
 if __name__ == "__main__":
     asyncio.run(start_monitoring())
@@ -0,0 +1,44 @@
+import logging
+from solana.rpc.types import TokenAccountOpts, DataSliceOpts
+from solders.pubkey import Pubkey
+from spl.token.constants import TOKEN_PROGRAM_ID
+
+
+class TokenAccountRegistry:
+    """Wallet-side set of mints the payer already holds a token account for.
+
+    Seeded once from a single bulk owner query (only the 32-byte mint prefix of
+    each account is requested) and updated as our own buys land, so buy_token
+    can decide on ATA creation without a per-buy RPC call. Pair it with
+    CreateIdempotent (ATA_IDEMPOTENT_CREATE) so a mint missing from the
+    registry cannot make a buy fail.
+    """
+
+    def __init__(self, client, owner):
+        self.client = client
+        self.owner = owner
+        self.mints = set()
+        self.seeded = False
+
+    async def seed(self):
+        try:
+            response = await self.client.get_token_accounts_by_owner(
+                self.owner,
+                TokenAccountOpts(program_id=TOKEN_PROGRAM_ID, data_slice=DataSliceOpts(offset=0, length=32))
+            )
+            for keyed_account in response.value:
+                self.mints.add(Pubkey.from_bytes(bytes(keyed_account.account.data[:32])))
+            self.seeded = True
+            logging.info(f"Token account registry seeded with {len(self.mints)} accounts")
+        except Exception as e:
+            logging.warning(f"Token account registry seed failed: {e}")
+        return len(self.mints)
+
+    def has_account(self, token_mint):
+        return token_mint in self.mints
+
+    def needs_create(self, token_mint):
+        return token_mint not in self.mints
+
+    def mark_created(self, token_mint):
+        self.mints.add(token_mint)
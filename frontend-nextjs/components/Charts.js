@@ -4,6 +4,9 @@ import { Chart as ChartJS, CategoryScale, LinearScale, PointElement, LineElement
 
 ChartJS.register(CategoryScale, LinearScale, PointElement, LineElement, BarElement, Title, Tooltip, Legend);
 
+// Buys recorded before confirmation tracking used 'success'; newer rows move from 'sent' to 'confirmed'
+export const landed = (t) => t.status === 'confirmed' || t.status === 'success';
+
 export default function Charts({ transactions }) {
   const profitData = {
     labels: transactions.map(t => new Date(t.timestamp).toLocaleTimeString()),
@@ -20,8 +23,8 @@ export default function Charts({ transactions }) {
     datasets: [{
       label: 'Success Rates',
       data: [
-        transactions.filter(t => t.transaction_type === 'buy' && t.status === 'success').length,
-        transactions.filter(t => t.transaction_type === 'sell' && t.status === 'success').length,
+        transactions.filter(t => t.transaction_type === 'buy' && landed(t)).length,
+        transactions.filter(t => t.transaction_type === 'sell' && landed(t)).length,
       ],
       backgroundColor: ['rgba(54, 162, 235, 0.6)', 'rgba(255, 99, 132, 0.6)'],
     }],
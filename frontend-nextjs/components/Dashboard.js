@@ -1,5 +1,5 @@
 
-import { useEffect, useState, useContext } from 'react';
+import { useEffect, useState, useContext, useRef } from 'react';
 import { SocketContext } from './SocketProvider';
 import TransactionLog from './TransactionLog';
 import Charts from './Charts';
@@ -7,6 +7,8 @@ import { toast } from 'react-toastify';
 import axios from 'axios';
 import { io } from 'socket.io-client';
 
+const PAGE_SIZE = 500;
+
 export default function Dashboard() {
   const { socketData } = useContext(SocketContext);
   const [contracts, setContracts] = useState([]);
@@ -19,8 +21,70 @@ export default function Dashboard() {
     activeContracts: 0,
   });
   const [balance, setBalance] = useState(0);
+  // Highest row id loaded per list, so socket events only fetch rows added since
+  const lastIds = useRef({ contracts: 0, transactions: 0 });
+  const summaryTimer = useRef(null);
+  const fetching = useRef({ running: false, again: false });
 
   useEffect(() => {
+    const fetchSummary = async () => {
+      try {
+        const summaryRes = await axios.get('https://xcute.onrender.com/api/summary');
+        updateMetrics(summaryRes.data);
+      } catch (error) {
+        console.error('Error fetching summary:', error);
+      }
+    };
+    // Totals aggregate the whole table, so a burst of events refreshes them once
+    const scheduleSummary = () => {
+      if (summaryTimer.current) return;
+      summaryTimer.current = setTimeout(() => {
+        summaryTimer.current = null;
+        fetchSummary();
+      }, 5000);
+    };
+
+    const fetchRows = async (name) => {
+      const rows = [];
+      for (;;) {
+        const res = await axios.get(`https://xcute.onrender.com/api/${name}`, { params: { after: lastIds.current[name], limit: PAGE_SIZE } });
+        if (!res.data.length) break;
+        rows.push(...res.data);
+        lastIds.current[name] = res.data[res.data.length - 1].id;
+        if (res.data.length < PAGE_SIZE) break;
+      }
+      return rows;
+    };
+    // Fetched rows replace the placeholders socket handlers appended for the same contract or trade
+    const mergeContracts = (rows) => setContracts(prev => {
+      const fresh = new Set(rows.map(c => c.contract));
+      return [...prev.filter(c => !fresh.has(c.contract)), ...rows];
+    });
+    const mergeTransactions = (rows) => setTransactions(prev => {
+      const fresh = new Set(rows.map(t => `${t.transaction_type}:${t.token_address}`));
+      return [...prev.filter(t => t.id !== undefined || !fresh.has(`${t.transaction_type}:${t.token_address}`)), ...rows];
+    });
+    // One incremental fetch at a time; events arriving meanwhile trigger a single follow-up
+    const fetchNew = async () => {
+      if (fetching.current.running) {
+        fetching.current.again = true;
+        return;
+      }
+      fetching.current.running = true;
+      do {
+        fetching.current.again = false;
+        try {
+          const [newContracts, newTransactions] = await Promise.all([fetchRows('contracts'), fetchRows('transactions')]);
+          if (newContracts.length) mergeContracts(newContracts);
+          if (newTransactions.length) mergeTransactions(newTransactions);
+        } catch (error) {
+          console.error('Error fetching new rows:', error);
+        }
+      } while (fetching.current.again);
+      fetching.current.running = false;
+      scheduleSummary();
+    };
+
     const fetchData = async () => {
       try {
         const [contractsRes, transactionsRes, balanceRes] = await Promise.all([
@@ -31,10 +95,12 @@ export default function Dashboard() {
         setContracts(contractsRes.data);
         setTransactions(transactionsRes.data);
         setBalance(balanceRes.data.balance);
-        updateMetrics(contractsRes.data, transactionsRes.data);
+        const lastId = (rows) => (rows.length ? rows[rows.length - 1].id : 0);
+        lastIds.current = { contracts: lastId(contractsRes.data), transactions: lastId(transactionsRes.data) };
       } catch (error) {
         console.error('Error fetching data:', error);
       }
+      fetchSummary();
     };
     fetchData();
 
@@ -46,13 +112,33 @@ export default function Dashboard() {
       console.log('New contract:', data);
       setContracts(prev => [...prev, data]);
       toast.info(`New contract: ${data.contract}`);
-      fetchData();
+      fetchNew();
+    });
+    socket.on('contract_batch', (batch) => {
+      console.log('New contracts:', batch);
+      setContracts(prev => [...prev, ...batch]);
+      toast.info(`${batch.length} new contracts`);
+      fetchNew();
     });
     socket.on('buy', (data) => {
       console.log('Buy succeeded:', data);
       setTransactions(prev => [...prev, { ...data, transaction_type: 'buy', status: 'success' }]);
       toast.success(`Buy executed: ${data.token_bought} for $${data.dollar_value}`);
-      fetchData();
+      fetchNew();
+    });
+    const applyStatuses = (updates) => {
+      const bySignature = Object.fromEntries(updates.map(u => [u.signature, u]));
+      setTransactions(prev => prev.map(t => bySignature[t.signature] ? { ...t, ...bySignature[t.signature] } : t));
+    };
+    socket.on('wallet_balance', (data) => setBalance(data.balance));
+    socket.on('transaction_status', (data) => {
+      applyStatuses([data]);
+      scheduleSummary();
+      if (data.status !== 'confirmed') toast.warn(`Transaction ${data.status}: ${data.signature.slice(0, 8)}...`);
+    });
+    socket.on('transaction_status_batch', (batch) => {
+      applyStatuses(batch);
+      scheduleSummary();
     });
     socket.on('buy_failed', (data) => {
       console.log('Buy failed:', data);
@@ -66,26 +152,25 @@ export default function Dashboard() {
         timestamp: data.timestamp
       }]);
       toast.error(`Buy failed: ${data.token} - ${data.error}`);
-      fetchData();
+      fetchNew();
     });
 
     return () => {
+      clearTimeout(summaryTimer.current);
       socket.disconnect();
       console.log('WebSocket disconnected');
     };
   }, []);
 
-  const updateMetrics = (contractsData, transactionsData) => {
-    const totalContracts = contractsData.length;
-    const successfulBuys = transactionsData.filter(t => t.transaction_type === 'buy' && t.status === 'success').length;
-    const successfulSells = transactionsData.filter(t => t.transaction_type === 'sell' && t.status === 'success').length;
-    const profit = transactionsData.reduce((acc, t) => {
-      return t.transaction_type === 'sell' && t.status === 'success' ? acc + t.amount_in_dollars : acc;
-    }, 0) - transactionsData.reduce((acc, t) => {
-      return t.transaction_type === 'buy' && t.status === 'success' ? acc + t.amount_in_dollars : acc;
-    }, 0);
-    const activeContracts = new Set(transactionsData.filter(t => t.transaction_type === 'buy' && t.status === 'success').map(t => t.token_address)).size;
-    setMetrics({ totalContracts, successfulBuys, successfulSells, profit, activeContracts });
+  // Totals come from /api/summary: the list endpoints only return the newest page of rows
+  const updateMetrics = (summary) => {
+    setMetrics({
+      totalContracts: summary.total_contracts,
+      successfulBuys: summary.successful_buys,
+      successfulSells: summary.successful_sells,
+      profit: summary.profit,
+      activeContracts: summary.active_contracts,
+    });
   };
 
   return (
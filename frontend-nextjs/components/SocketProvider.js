@@ -16,6 +16,12 @@ const SocketProvider = ({ children }) => {
         contracts: [data, ...prev.contracts.slice(0, 9)], // Limit to 10
       }));
     });
+    socket.on('contract_batch', (batch) => {
+      setSocketData((prev) => ({
+        ...prev,
+        contracts: [...batch.slice().reverse(), ...prev.contracts].slice(0, 10), // Limit to 10
+      }));
+    });
     socket.on('buy', (data) => {
       setSocketData((prev) => ({
         ...prev,
@@ -32,6 +38,7 @@ const SocketProvider = ({ children }) => {
     return () => {
       socket.off('connect');
       socket.off('contract');
+      socket.off('contract_batch');
       socket.off('buy');
       socket.off('sell');
     };